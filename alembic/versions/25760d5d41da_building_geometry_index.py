@@ -0,0 +1,32 @@
+"""building geometry index
+
+Revision ID: 25760d5d41da
+Revises: 753dc710fc81
+Create Date: 2026-10-18 18:05:12.204117
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '25760d5d41da'
+down_revision: Union[str, Sequence[str], None] = '753dc710fc81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Тайлы отбираются в плоских координатах: в geography рёбра тайлов нулевого и
+    # первого масштаба длиной 180° по долготе вырождаются
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_buildings_geolocation_geometry '
+        'ON buildings USING gist ((CAST(geolocation AS geometry(POINT,4326))));',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP INDEX IF EXISTS ix_buildings_geolocation_geometry;')
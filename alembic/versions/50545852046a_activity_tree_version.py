@@ -0,0 +1,61 @@
+"""activity tree version
+
+Revision ID: 50545852046a
+Revises: de719afe98f2
+Create Date: 2026-10-18 11:48:03.917245
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '50545852046a'
+down_revision: Union[str, Sequence[str], None] = 'de719afe98f2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'activity_tree_version',
+        sa.Column('id', sa.SmallInteger(), server_default='1', nullable=False),
+        sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+        sa.CheckConstraint('id = 1', name='activity_tree_version_single_row'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.execute('INSERT INTO activity_tree_version (id, version) VALUES (1, 0);')
+
+    # Любое изменение дерева увеличивает версию и оповещает подписчиков
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_activity_tree_version()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            new_version BIGINT;
+        BEGIN
+            UPDATE activity_tree_version
+            SET version = version + 1
+            WHERE id = 1
+            RETURNING version INTO new_version;
+
+            PERFORM pg_notify('activity_tree', new_version::TEXT);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER bump_activity_tree_version_trigger
+            AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON activities
+            FOR EACH STATEMENT
+            EXECUTE FUNCTION bump_activity_tree_version();
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP TRIGGER IF EXISTS bump_activity_tree_version_trigger ON activities;')
+    op.execute('DROP FUNCTION IF EXISTS bump_activity_tree_version();')
+    op.drop_table('activity_tree_version')
@@ -0,0 +1,46 @@
+"""pagination indexes
+
+Revision ID: 6e2f327fc36d
+Revises: ecc0565595c0
+Create Date: 2026-10-18 10:12:41.204518
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '6e2f327fc36d'
+down_revision: Union[str, Sequence[str], None] = 'ecc0565595c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_organizations_building_id_id',
+        'organizations',
+        ['building_id', 'id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_organization_activity_activity_id',
+        'organization_activity',
+        ['activity_id', 'organization_id'],
+        unique=False,
+    )
+    op.create_index(
+        'ix_organization_phones_organization_id',
+        'organization_phones',
+        ['organization_id'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_organization_phones_organization_id', table_name='organization_phones')
+    op.drop_index('ix_organization_activity_activity_id', table_name='organization_activity')
+    op.drop_index('ix_organizations_building_id_id', table_name='organizations')
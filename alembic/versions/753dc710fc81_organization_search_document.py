@@ -0,0 +1,213 @@
+"""organization search document
+
+Revision ID: 753dc710fc81
+Revises: e2dda040108c
+Create Date: 2026-10-18 15:02:44.107391
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '753dc710fc81'
+down_revision: Union[str, Sequence[str], None] = 'e2dda040108c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'organizations',
+        sa.Column(
+            'search_document',
+            postgresql.TSVECTOR(),
+            server_default=sa.text("''::tsvector"),
+            nullable=False,
+        ),
+    )
+
+    # Документ: название (вес A), виды деятельности (B) и адрес здания (C).
+    # Конфигурация 'simple' не зависит от языка названий
+    op.execute("""
+        CREATE OR REPLACE FUNCTION organization_search_document(
+            organization_id INTEGER,
+            organization_name TEXT,
+            organization_building_id INTEGER
+        )
+        RETURNS tsvector AS $$
+            SELECT
+                setweight(to_tsvector('simple', coalesce(organization_name, '')), 'A')
+                || setweight(to_tsvector('simple', coalesce((
+                    SELECT string_agg(a.name, ' ')
+                    FROM organization_activity oa
+                    JOIN activities a ON a.id = oa.activity_id
+                    WHERE oa.organization_id = organization_search_document.organization_id
+                ), '')), 'B')
+                || setweight(to_tsvector('simple', coalesce((
+                    SELECT b.address
+                    FROM buildings b
+                    WHERE b.id = organization_building_id
+                ), '')), 'C');
+        $$ LANGUAGE sql STABLE;
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION refresh_organization_search_documents(organization_ids INTEGER[])
+        RETURNS VOID AS $$
+            UPDATE organizations o
+            SET search_document = organization_search_document(o.id, o.name, o.building_id)
+            WHERE o.id = ANY(organization_ids);
+        $$ LANGUAGE sql;
+    """)
+
+    # Изменение самой организации пересчитывает документ до записи строки
+    op.execute("""
+        CREATE OR REPLACE FUNCTION set_organization_search_document()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            NEW.search_document := organization_search_document(NEW.id, NEW.name, NEW.building_id);
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER set_organization_search_document_trigger
+            BEFORE INSERT OR UPDATE OF name, building_id ON organizations
+            FOR EACH ROW
+            EXECUTE FUNCTION set_organization_search_document();
+    """)
+
+    # Остальные таблицы обновляют затронутые организации одним UPDATE на
+    # оператор: COPY и многострочные INSERT не пересчитывают документ построчно
+    op.execute("""
+        CREATE OR REPLACE FUNCTION organization_activity_search_document()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM refresh_organization_search_documents(
+                    ARRAY(SELECT DISTINCT organization_id FROM old_rows)
+                );
+            ELSE
+                PERFORM refresh_organization_search_documents(
+                    ARRAY(SELECT DISTINCT organization_id FROM new_rows)
+                );
+            END IF;
+            IF TG_OP = 'UPDATE' THEN
+                PERFORM refresh_organization_search_documents(
+                    ARRAY(SELECT DISTINCT organization_id FROM old_rows)
+                );
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER organization_activity_search_document_insert_trigger
+            AFTER INSERT ON organization_activity
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT
+            EXECUTE FUNCTION organization_activity_search_document();
+    """)
+    op.execute("""
+        CREATE TRIGGER organization_activity_search_document_update_trigger
+            AFTER UPDATE ON organization_activity
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT
+            EXECUTE FUNCTION organization_activity_search_document();
+    """)
+    op.execute("""
+        CREATE TRIGGER organization_activity_search_document_delete_trigger
+            AFTER DELETE ON organization_activity
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT
+            EXECUTE FUNCTION organization_activity_search_document();
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION activity_search_document()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            PERFORM refresh_organization_search_documents(ARRAY(
+                SELECT DISTINCT oa.organization_id
+                FROM new_rows n
+                JOIN old_rows o ON o.id = n.id
+                JOIN organization_activity oa ON oa.activity_id = n.id
+                WHERE n.name IS DISTINCT FROM o.name
+            ));
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER activity_search_document_trigger
+            AFTER UPDATE ON activities
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT
+            EXECUTE FUNCTION activity_search_document();
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION building_search_document()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            PERFORM refresh_organization_search_documents(ARRAY(
+                SELECT org.id
+                FROM new_rows n
+                JOIN old_rows o ON o.id = n.id
+                JOIN organizations org ON org.building_id = n.id
+                WHERE n.address IS DISTINCT FROM o.address
+            ));
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER building_search_document_trigger
+            AFTER UPDATE ON buildings
+            REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+            FOR EACH STATEMENT
+            EXECUTE FUNCTION building_search_document();
+    """)
+
+    # Заполняем документы для уже существующих организаций
+    op.execute("""
+        UPDATE organizations
+        SET search_document = organization_search_document(id, name, building_id);
+    """)
+    op.create_index(
+        'ix_organizations_search_document',
+        'organizations',
+        ['search_document'],
+        unique=False,
+        postgresql_using='gin',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        'ix_organizations_search_document',
+        table_name='organizations',
+        postgresql_using='gin',
+    )
+    op.execute('DROP TRIGGER IF EXISTS building_search_document_trigger ON buildings;')
+    op.execute('DROP FUNCTION IF EXISTS building_search_document();')
+    op.execute('DROP TRIGGER IF EXISTS activity_search_document_trigger ON activities;')
+    op.execute('DROP FUNCTION IF EXISTS activity_search_document();')
+    for event in ('insert', 'update', 'delete'):
+        op.execute(
+            f'DROP TRIGGER IF EXISTS organization_activity_search_document_{event}_trigger '
+            'ON organization_activity;',
+        )
+    op.execute('DROP FUNCTION IF EXISTS organization_activity_search_document();')
+    op.execute(
+        'DROP TRIGGER IF EXISTS set_organization_search_document_trigger ON organizations;',
+    )
+    op.execute('DROP FUNCTION IF EXISTS set_organization_search_document();')
+    op.execute('DROP FUNCTION IF EXISTS refresh_organization_search_documents(INTEGER[]);')
+    op.execute('DROP FUNCTION IF EXISTS organization_search_document(INTEGER, TEXT, INTEGER);')
+    op.drop_column('organizations', 'search_document')
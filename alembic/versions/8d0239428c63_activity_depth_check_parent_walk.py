@@ -0,0 +1,202 @@
+"""activity depth check walks parent_id
+
+Revision ID: 8d0239428c63
+Revises: 25760d5d41da
+Create Date: 2026-10-18 19:12:40.318504
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '8d0239428c63'
+down_revision: Union[str, Sequence[str], None] = '25760d5d41da'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_activities_parent_id', 'activities', ['parent_id'], unique=False)
+
+    # Замыкание заполняется AFTER-триггером только в конце оператора, поэтому
+    # BEFORE-триггер проверяет глубину и циклы по parent_id: строки, вставленные
+    # или изменённые тем же оператором раньше, в activities уже видны
+    op.execute("""
+        CREATE OR REPLACE FUNCTION check_activity_depth()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            parent_depth INTEGER := 0;
+            subtree_height INTEGER;
+            current_id INTEGER := NEW.parent_id;
+        BEGIN
+            IF NEW.parent_id IS NULL THEN
+                RETURN NEW;
+            END IF;
+
+            IF TG_OP = 'UPDATE' AND NEW.parent_id IS NOT DISTINCT FROM OLD.parent_id THEN
+                RETURN NEW;
+            END IF;
+
+            -- Не больше трёх шагов вверх: глубже дерево быть не может
+            WHILE current_id IS NOT NULL AND parent_depth <= 3 LOOP
+                IF current_id = NEW.id THEN
+                    RAISE EXCEPTION 'Activity (id=%) cannot be moved under its own descendant (id=%).', NEW.id, NEW.parent_id;
+                END IF;
+                parent_depth := parent_depth + 1;
+                SELECT parent_id INTO current_id FROM activities WHERE id = current_id;
+            END LOOP;
+
+            -- Высота поддерева самой строки, тоже не глубже трёх уровней
+            WITH RECURSIVE subtree AS (
+                SELECT id, 1 AS height
+                FROM activities
+                WHERE parent_id = NEW.id
+
+                UNION ALL
+
+                SELECT a.id, s.height + 1
+                FROM activities a
+                JOIN subtree s ON a.parent_id = s.id
+                WHERE s.height < 3
+            )
+            SELECT COALESCE(MAX(height), 0) INTO subtree_height
+            FROM subtree;
+
+            IF parent_depth + 1 + subtree_height > 3 THEN
+                RAISE EXCEPTION 'Maximum hierarchy depth of 3 exceeded. Parent activity (id=%) is already at depth %.', NEW.parent_id, parent_depth;
+            END IF;
+
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+    # Потомок, вставленный тем же оператором раньше родителя, получает строки
+    # замыкания до того, как они появятся у родителя: родитель подвешивает их сам
+    op.execute("""
+        CREATE OR REPLACE FUNCTION maintain_activity_closure()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+                VALUES (NEW.id, NEW.id, 0);
+
+                INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+                SELECT NEW.id, sub.descendant_id, sub.depth + 1
+                FROM activities child
+                JOIN activity_closure sub ON sub.ancestor_id = child.id
+                WHERE child.parent_id = NEW.id;
+            ELSE
+                IF NEW.parent_id IS NOT DISTINCT FROM OLD.parent_id THEN
+                    RETURN NULL;
+                END IF;
+
+                -- Отрываем поддерево от всех прежних предков
+                DELETE FROM activity_closure c
+                USING activity_closure sup, activity_closure sub
+                WHERE sup.descendant_id = NEW.id
+                  AND sup.ancestor_id <> NEW.id
+                  AND sub.ancestor_id = NEW.id
+                  AND c.ancestor_id = sup.ancestor_id
+                  AND c.descendant_id = sub.descendant_id;
+            END IF;
+
+            -- Подвешиваем поддерево ко всем предкам нового родителя
+            IF NEW.parent_id IS NOT NULL THEN
+                INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+                SELECT sup.ancestor_id, sub.descendant_id, sup.depth + sub.depth + 1
+                FROM activity_closure sup
+                CROSS JOIN activity_closure sub
+                WHERE sup.descendant_id = NEW.parent_id
+                  AND sub.ancestor_id = NEW.id;
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("""
+        CREATE OR REPLACE FUNCTION maintain_activity_closure()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+                VALUES (NEW.id, NEW.id, 0);
+            ELSE
+                IF NEW.parent_id IS NOT DISTINCT FROM OLD.parent_id THEN
+                    RETURN NULL;
+                END IF;
+
+                -- Отрываем поддерево от всех прежних предков
+                DELETE FROM activity_closure c
+                USING activity_closure sup, activity_closure sub
+                WHERE sup.descendant_id = NEW.id
+                  AND sup.ancestor_id <> NEW.id
+                  AND sub.ancestor_id = NEW.id
+                  AND c.ancestor_id = sup.ancestor_id
+                  AND c.descendant_id = sub.descendant_id;
+            END IF;
+
+            -- Подвешиваем поддерево ко всем предкам нового родителя
+            IF NEW.parent_id IS NOT NULL THEN
+                INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+                SELECT sup.ancestor_id, sub.descendant_id, sup.depth + sub.depth + 1
+                FROM activity_closure sup
+                CROSS JOIN activity_closure sub
+                WHERE sup.descendant_id = NEW.parent_id
+                  AND sub.ancestor_id = NEW.id;
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION check_activity_depth()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            parent_depth INTEGER;
+            subtree_height INTEGER := 0;
+        BEGIN
+            IF NEW.parent_id IS NULL THEN
+                RETURN NEW;
+            END IF;
+
+            IF TG_OP = 'UPDATE' THEN
+                IF NEW.parent_id IS NOT DISTINCT FROM OLD.parent_id THEN
+                    RETURN NEW;
+                END IF;
+
+                IF EXISTS (
+                    SELECT 1
+                    FROM activity_closure
+                    WHERE ancestor_id = NEW.id AND descendant_id = NEW.parent_id
+                ) THEN
+                    RAISE EXCEPTION 'Activity (id=%) cannot be moved under its own descendant (id=%).', NEW.id, NEW.parent_id;
+                END IF;
+
+                SELECT COALESCE(MAX(depth), 0) INTO subtree_height
+                FROM activity_closure
+                WHERE ancestor_id = NEW.id;
+            END IF;
+
+            SELECT COUNT(*) INTO parent_depth
+            FROM activity_closure
+            WHERE descendant_id = NEW.parent_id;
+
+            IF parent_depth + 1 + subtree_height > 3 THEN
+                RAISE EXCEPTION 'Maximum hierarchy depth of 3 exceeded. Parent activity (id=%) is already at depth %.', NEW.parent_id, parent_depth;
+            END IF;
+
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.drop_index('ix_activities_parent_id', table_name='activities')
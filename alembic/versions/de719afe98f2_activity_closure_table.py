@@ -0,0 +1,194 @@
+"""activity closure table
+
+Revision ID: de719afe98f2
+Revises: 6e2f327fc36d
+Create Date: 2026-10-18 11:02:17.553120
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'de719afe98f2'
+down_revision: Union[str, Sequence[str], None] = '6e2f327fc36d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'activity_closure',
+        sa.Column('ancestor_id', sa.Integer(), nullable=False),
+        sa.Column('descendant_id', sa.Integer(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['activities.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['descendant_id'], ['activities.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id'),
+    )
+    op.create_index(
+        'ix_activity_closure_descendant_id',
+        'activity_closure',
+        ['descendant_id', 'depth'],
+        unique=False,
+    )
+
+    # Заполняем замыкание для уже существующих видов деятельности
+    op.execute("""
+        INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE paths AS (
+            SELECT id AS ancestor_id, id AS descendant_id, 0 AS depth
+            FROM activities
+
+            UNION ALL
+
+            SELECT p.ancestor_id, a.id, p.depth + 1
+            FROM activities a
+            JOIN paths p ON a.parent_id = p.descendant_id
+        )
+        SELECT ancestor_id, descendant_id, depth FROM paths;
+    """)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION maintain_activity_closure()
+        RETURNS TRIGGER AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+                VALUES (NEW.id, NEW.id, 0);
+            ELSE
+                IF NEW.parent_id IS NOT DISTINCT FROM OLD.parent_id THEN
+                    RETURN NULL;
+                END IF;
+
+                -- Отрываем поддерево от всех прежних предков
+                DELETE FROM activity_closure c
+                USING activity_closure sup, activity_closure sub
+                WHERE sup.descendant_id = NEW.id
+                  AND sup.ancestor_id <> NEW.id
+                  AND sub.ancestor_id = NEW.id
+                  AND c.ancestor_id = sup.ancestor_id
+                  AND c.descendant_id = sub.descendant_id;
+            END IF;
+
+            -- Подвешиваем поддерево ко всем предкам нового родителя
+            IF NEW.parent_id IS NOT NULL THEN
+                INSERT INTO activity_closure (ancestor_id, descendant_id, depth)
+                SELECT sup.ancestor_id, sub.descendant_id, sup.depth + sub.depth + 1
+                FROM activity_closure sup
+                CROSS JOIN activity_closure sub
+                WHERE sup.descendant_id = NEW.parent_id
+                  AND sub.ancestor_id = NEW.id;
+            END IF;
+
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute("""
+        CREATE TRIGGER maintain_activity_closure_trigger
+            AFTER INSERT OR UPDATE OF parent_id ON activities
+            FOR EACH ROW
+            EXECUTE FUNCTION maintain_activity_closure();
+    """)
+
+    # Глубина берётся из замыкания: у узла на уровне N ровно N строк-предков
+    op.execute("""
+        CREATE OR REPLACE FUNCTION check_activity_depth()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            parent_depth INTEGER;
+            subtree_height INTEGER := 0;
+        BEGIN
+            IF NEW.parent_id IS NULL THEN
+                RETURN NEW;
+            END IF;
+
+            IF TG_OP = 'UPDATE' THEN
+                IF NEW.parent_id IS NOT DISTINCT FROM OLD.parent_id THEN
+                    RETURN NEW;
+                END IF;
+
+                IF EXISTS (
+                    SELECT 1
+                    FROM activity_closure
+                    WHERE ancestor_id = NEW.id AND descendant_id = NEW.parent_id
+                ) THEN
+                    RAISE EXCEPTION 'Activity (id=%) cannot be moved under its own descendant (id=%).', NEW.id, NEW.parent_id;
+                END IF;
+
+                SELECT COALESCE(MAX(depth), 0) INTO subtree_height
+                FROM activity_closure
+                WHERE ancestor_id = NEW.id;
+            END IF;
+
+            SELECT COUNT(*) INTO parent_depth
+            FROM activity_closure
+            WHERE descendant_id = NEW.parent_id;
+
+            IF parent_depth + 1 + subtree_height > 3 THEN
+                RAISE EXCEPTION 'Maximum hierarchy depth of 3 exceeded. Parent activity (id=%) is already at depth %.', NEW.parent_id, parent_depth;
+            END IF;
+
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("""
+        CREATE OR REPLACE FUNCTION check_activity_depth()
+        RETURNS TRIGGER AS $$
+        DECLARE
+            current_depth INTEGER;
+        BEGIN
+            IF NEW.parent_id IS NULL THEN
+                RETURN NEW;
+            END IF;
+
+            WITH RECURSIVE hierarchy_path AS (
+                SELECT
+                    id,
+                    parent_id,
+                    1 AS depth
+                FROM
+                    activities
+                WHERE
+                    id = NEW.parent_id
+
+                UNION ALL
+
+                SELECT
+                    a.id,
+                    a.parent_id,
+                    h.depth + 1
+                FROM
+                    activities a
+                JOIN
+                    hierarchy_path h ON a.id = h.parent_id
+            )
+
+            SELECT MAX(depth) INTO current_depth
+            FROM hierarchy_path;
+
+            IF NOT FOUND OR current_depth IS NULL THEN
+                RETURN NEW;
+            END IF;
+
+            IF current_depth >= 3 THEN
+                RAISE EXCEPTION 'Maximum hierarchy depth of 3 exceeded. Parent activity (id=%) is already at depth %.', NEW.parent_id, current_depth;
+            END IF;
+
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql;
+    """)
+    op.execute('DROP TRIGGER IF EXISTS maintain_activity_closure_trigger ON activities;')
+    op.execute('DROP FUNCTION IF EXISTS maintain_activity_closure();')
+    op.drop_index('ix_activity_closure_descendant_id', table_name='activity_closure')
+    op.drop_table('activity_closure')
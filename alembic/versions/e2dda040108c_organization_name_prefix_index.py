@@ -0,0 +1,31 @@
+"""organization name prefix index
+
+Revision ID: e2dda040108c
+Revises: 50545852046a
+Create Date: 2026-10-18 14:21:36.480912
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2dda040108c'
+down_revision: Union[str, Sequence[str], None] = '50545852046a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Побайтовое сравнение (COLLATE "C") позволяет искать по префиксу диапазоном
+    op.execute(
+        'CREATE INDEX IF NOT EXISTS ix_organizations_name_prefix '
+        'ON organizations (lower(name) COLLATE "C", id);',
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('DROP INDEX IF EXISTS ix_organizations_name_prefix;')
@@ -0,0 +1,86 @@
+import json
+import platform
+import statistics
+import subprocess
+from contextlib import contextmanager
+from datetime import UTC, datetime
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+def summarize(durations: list[float]) -> dict[str, float]:
+    """Latency summary in milliseconds."""
+    if not durations:
+        return {'count': 0}
+
+    ordered = sorted(durations)
+    quantiles = statistics.quantiles(ordered, n=100, method='inclusive') if len(ordered) > 1 else []
+
+    def percentile(value: int) -> float:
+        return (quantiles[value - 1] if quantiles else ordered[0]) * 1000
+
+    return {
+        'count': len(ordered),
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'max_ms': ordered[-1] * 1000,
+    }
+
+
+def over_budget(results: dict[str, dict]) -> list[str]:
+    """Scenarios that ran more SQL statements per call than their budget allows."""
+    return [
+        scenario
+        for scenario, result in sorted(results.items())
+        if 'statement_budget' in result
+        and result.get('statements_per_call', 0) > result['statement_budget']
+    ]
+
+
+class StatementCounter:
+    """Count SQL statements sent through an engine."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def _on_execute(self, *args) -> None:
+        self.count += 1
+
+    @contextmanager
+    def attached(self, engine: Engine):
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+        try:
+            yield self
+        finally:
+            event.remove(engine, 'before_cursor_execute', self._on_execute)
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(  # noqa: S603
+            ['git', 'rev-parse', '--short', 'HEAD'],  # noqa: S607
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(path: str | None, kind: str, results: dict, parameters: dict) -> None:
+    report = {
+        'kind': kind,
+        'revision': git_revision(),
+        'created_at': datetime.now(UTC).isoformat(),
+        'python': platform.python_version(),
+        'parameters': parameters,
+        'results': results,
+    }
+    content = json.dumps(report, indent=2, sort_keys=True)
+    if path:
+        Path(path).write_text(content + '\n')
+    print(content)
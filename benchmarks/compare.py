@@ -0,0 +1,70 @@
+"""Compare two benchmark reports and flag regressions.
+
+Besides relative changes, scenarios of the new report that exceed their
+absolute SQL statement budget count as regressions.
+
+uv run python -m benchmarks.compare before.json after.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from benchmarks.common import over_budget
+
+# Метрики, рост которых считается ухудшением
+LOWER_IS_BETTER = ('p50_ms', 'p95_ms', 'p99_ms', 'statements_per_call')
+HIGHER_IS_BETTER = ('rps',)
+
+
+def compare(before: dict, after: dict, threshold: float) -> list[str]:
+    regressions = []
+    for scenario, old in sorted(before['results'].items()):
+        new = after['results'].get(scenario)
+        if new is None:
+            print(f'{scenario}: missing in the new report')
+            continue
+
+        for metric in (*LOWER_IS_BETTER, *HIGHER_IS_BETTER):
+            if metric not in old or metric not in new:
+                continue
+
+            change = (new[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+            worse = change > threshold if metric in LOWER_IS_BETTER else change < -threshold
+            marker = '  REGRESSION' if worse else ''
+            print(
+                f'{scenario:>20} {metric:>20}: '
+                f'{old[metric]:>10.2f} -> {new[metric]:>10.2f} ({change:+6.1f}%){marker}',
+            )
+            if worse:
+                regressions.append(f'{scenario}.{metric}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=10, help='Allowed change, percent')
+    args = parser.parse_args()
+
+    before = json.loads(Path(args.before).read_text())
+    after = json.loads(Path(args.after).read_text())
+    print(f'{before.get("revision")} -> {after.get("revision")}')
+
+    regressions = compare(before, after, args.threshold)
+    for scenario in over_budget(after['results']):
+        result = after['results'][scenario]
+        print(
+            f'{scenario:>20} {"statement_budget":>20}: '
+            f'{result["statements_per_call"]} > {result["statement_budget"]}  OVER BUDGET',
+        )
+        regressions.append(f'{scenario}.statement_budget')
+    if regressions:
+        print(f'Regressions: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Check that the organizations export streams with flat memory.
+
+Consumes the export generator like StreamingResponse would and samples
+Python heap (tracemalloc) and process RSS while rows flow. Fails if memory
+keeps growing after the first chunks. Meant for a large dataset:
+
+    uv run poe add_test_data --organizations 1000000 --yes
+    uv run python -m benchmarks.export_memory --format csv
+"""
+
+import argparse
+import asyncio
+import resource
+import sys
+import time
+import tracemalloc
+
+from benchmarks.common import write_report
+from db import async_engine
+from schemas import ExportFormat
+from services import organizations_service
+from services.activity_service import activity_tree_cache
+
+MEGABYTE = 1 << 20
+
+
+async def main(args: argparse.Namespace) -> int:
+    tracemalloc.start()
+    started = time.perf_counter()
+    chunks = 0
+    size = 0
+    baseline = None
+    samples = []
+
+    async for chunk in organizations_service.export_organizations(args.format, []):
+        chunks += 1
+        size += len(chunk)
+        if chunks == args.warmup_chunks:
+            baseline = tracemalloc.get_traced_memory()[0]
+        if chunks % args.sample_every == 0:
+            current, peak = tracemalloc.get_traced_memory()
+            # ru_maxrss в Linux в килобайтах
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+            samples.append({'chunks': chunks, 'bytes': size, 'heap': current, 'rss': rss})
+            print(
+                f'{chunks:>8} chunks {size / MEGABYTE:>10.1f} MB sent, '
+                f'heap {current / MEGABYTE:.1f} MB (peak {peak / MEGABYTE:.1f}), '
+                f'max RSS {rss / MEGABYTE:.1f} MB',
+            )
+
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    await activity_tree_cache.stop()
+    await async_engine.dispose()
+
+    growth = (peak - baseline) / MEGABYTE if baseline is not None else 0.0
+    results = {
+        'chunks': chunks,
+        'megabytes': size / MEGABYTE,
+        'seconds': elapsed,
+        'heap_growth_mb': growth,
+        'samples': samples,
+    }
+    write_report(args.output, 'export_memory', results, vars(args))
+
+    if growth > args.max_growth_mb:
+        print(f'Heap grew by {growth:.1f} MB after warmup (limit {args.max_growth_mb} MB)')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--format', type=ExportFormat, default=ExportFormat.NDJSON)
+    parser.add_argument('--warmup-chunks', type=int, default=5)
+    parser.add_argument('--sample-every', type=int, default=100)
+    parser.add_argument('--max-growth-mb', type=float, default=20)
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,193 @@
+"""HTTP load scenario for the organizations API.
+
+Runs a weighted mix of name, building, activity, location, nearby and id
+lookups with a fixed number of concurrent clients for a fixed duration.
+Parameters are drawn from the ranges produced by populate_test_data.py.
+The server's /metrics are scraped before and after the run to report SQL
+statements, DB time and serialization time per request for every route;
+servers without /metrics (the revisions before it) get no server report.
+
+    uv run python -m benchmarks.load_test --url http://localhost:8000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import random
+import re
+import time
+from collections import Counter, defaultdict
+
+import httpx
+from benchmarks.common import summarize, write_report
+
+# Москва, как область 'city' в populate_test_data.py
+DEFAULT_BBOX = '37.35,55.57,37.85,55.91'
+NAME_QUERIES = ['Horns', 'Milk', 'Bread', 'Auto', 'Tech', 'Med', 'Trade', 'Service', 'Agro']
+
+# Доли запросов в сценарии
+WEIGHTS = {
+    'by_id': 4,
+    'by_name': 2,
+    'by_building': 2,
+    'by_activity': 2,
+    'by_location': 2,
+    'nearby': 1,
+}
+
+
+def make_request(name: str, rng: random.Random, args: argparse.Namespace) -> tuple[str, dict]:
+    min_lon, min_lat, max_lon, max_lat = (float(value) for value in args.bbox.split(','))
+    lon, lat = rng.uniform(min_lon, max_lon), rng.uniform(min_lat, max_lat)
+    limit = {'limit': args.limit}
+
+    match name:
+        case 'by_id':
+            return f'/organizations/{rng.randint(1, args.organizations)}', {}
+        case 'by_name':
+            return '/organizations/name', {'q': rng.choice(NAME_QUERIES), **limit}
+        case 'by_building':
+            return '/organizations/building', {'q': rng.randint(1, args.buildings), **limit}
+        case 'by_activity':
+            return '/organizations/activity', {'q': rng.randint(1, args.activities), **limit}
+        case 'by_location':
+            return '/organizations/location', {
+                'min_lon': lon - args.box,
+                'min_lat': lat - args.box,
+                'max_lon': lon + args.box,
+                'max_lat': lat + args.box,
+                **limit,
+            }
+        case 'nearby':
+            return '/organizations/nearby', {
+                'lat': lat,
+                'lon': lon,
+                'radius_m': args.box * 111_000,
+                **limit,
+            }
+    raise ValueError(name)
+
+
+# Гистограммы /metrics, средние по которым сравниваются до и после прогона
+SERVER_METRICS = {
+    'statements': 'db_statements_per_request',
+    'db_seconds': 'db_time_per_request_seconds',
+    'serialization_seconds': 'serialization_time_per_request_seconds',
+}
+ROUTE_LABEL = re.compile(r'route="([^"]*)"')
+
+
+async def scrape_metrics(client: httpx.AsyncClient) -> dict[tuple[str, str], float]:
+    """Read `_sum` and `_count` of the per-request histograms by route."""
+    response = await client.get('/metrics')
+    if response.status_code == httpx.codes.NOT_FOUND:
+        return {}
+    response.raise_for_status()
+
+    names = {f'{name}_{suffix}' for name in SERVER_METRICS.values() for suffix in ('sum', 'count')}
+    values = {}
+    for line in response.text.splitlines():
+        series, _, value = line.rpartition(' ')
+        name = series.partition('{')[0]
+        route = ROUTE_LABEL.search(series)
+        if name in names and route is not None:
+            values[(name, route.group(1))] = float(value)
+    return values
+
+
+def server_report(before: dict, after: dict) -> dict[str, dict[str, float]]:
+    def delta(name: str, route: str) -> float:
+        return after[(name, route)] - before.get((name, route), 0)
+
+    report = {}
+    for route in sorted({route for _, route in after}):
+        # Все гистограммы наблюдаются один раз на запрос, количество у них общее
+        requests = delta(f'{SERVER_METRICS["statements"]}_count', route)
+        if requests:
+            report[route] = {
+                'requests': requests,
+                **{
+                    key: delta(f'{metric}_sum', route) / requests
+                    for key, metric in SERVER_METRICS.items()
+                },
+            }
+    return report
+
+
+async def worker(
+    client: httpx.AsyncClient,
+    deadline: float,
+    seed: int,
+    args: argparse.Namespace,
+    durations: dict[str, list[float]],
+    statuses: dict[str, Counter],
+) -> None:
+    rng = random.Random(seed)
+    names = args.scenarios
+    weights = [WEIGHTS[name] for name in names]
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights=weights)[0]
+        path, params = make_request(name, rng, args)
+        started = time.perf_counter()
+        try:
+            response = await client.get(path, params=params)
+            status = str(response.status_code)
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        durations[name].append(time.perf_counter() - started)
+        statuses[name][status] += 1
+
+
+async def main(args: argparse.Namespace) -> None:
+    durations = defaultdict(list)
+    statuses = defaultdict(Counter)
+    limits = httpx.Limits(max_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30) as client:
+        metrics_before = await scrape_metrics(client)
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(
+            *(
+                worker(client, deadline, args.seed + index, args, durations, statuses)
+                for index in range(args.concurrency)
+            ),
+        )
+        elapsed = time.perf_counter() - started
+        metrics_after = await scrape_metrics(client)
+
+    results = {
+        name: {
+            **summarize(values),
+            'rps': len(values) / elapsed,
+            'statuses': dict(statuses[name]),
+        }
+        for name, values in sorted(durations.items())
+    }
+    all_durations = [value for values in durations.values() for value in values]
+    results['total'] = {**summarize(all_durations), 'rps': len(all_durations) / elapsed}
+    # Средние на запрос по данным сервера, в разрезе шаблонов маршрутов
+    results['server'] = server_report(metrics_before, metrics_after)
+    write_report(args.output, 'load', results, vars(args))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=30, help='Seconds')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument(
+        '--scenarios',
+        nargs='+',
+        choices=list(WEIGHTS),
+        default=list(WEIGHTS),
+        help='Request kinds to mix, e.g. without nearby for servers that lack it',
+    )
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--box', type=float, default=0.01, help='Half-size of bbox, degrees')
+    parser.add_argument('--bbox', default=DEFAULT_BBOX, help='min_lon,min_lat,max_lon,max_lat')
+    parser.add_argument('--organizations', type=int, default=10_000)
+    parser.add_argument('--buildings', type=int, default=1_000)
+    parser.add_argument('--activities', type=int, default=5 + 5 * 4 + 5 * 4 * 3)
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,373 @@
+"""Micro benchmarks for organizations_service against a live database.
+
+Every scenario runs in a fresh session, like a request would, and reports
+latency percentiles together with the number of SQL statements per call.
+Scenarios with an entry in STATEMENT_BUDGETS fail the run (exit code 1) when
+they execute more statements than the budget allows. The serialization
+scenarios encode one loaded page (10k organizations by default) with the
+API's encoder and with the alternatives it replaced. The activity_tree
+scenarios insert a synthetic tree (about 10k activities) in a transaction that
+is rolled back and resolve the descendants of a root through the closure table
+and through a recursive CTE. The coordinates scenarios load the points of up
+to 10k buildings as WKB decoded by shapely and as ST_X/ST_Y floats.
+
+    uv run python -m benchmarks.service_bench --iterations 200 --output before.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections.abc import Awaitable, Callable
+
+from benchmarks.common import StatementCounter, over_budget, summarize, write_report
+from db import async_engine, async_session_factory, read_session_factory
+from models import Activity, Building, Organization, activity_closure
+from pydantic import TypeAdapter
+from schemas import NameSearchMode, OrganizationOut, Page, dump_geom
+from serialization import dump_json, organization_item
+from services import organizations_service
+from services.activity_service import activity_tree_cache
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+Scenario = Callable[[AsyncSession], Awaitable[object]]
+
+# Предельное число SQL-запросов на вызов, не зависящее от размера страницы:
+# ORM-страница - основной запрос и два selectin, JSON из PostgreSQL - один запрос
+STATEMENT_BUDGETS = {
+    'by_id': 3,
+    # Плюс set_config порога похожести
+    'by_name': 4,
+    'by_building': 3,
+    'by_activity': 3,
+    'by_activity_json': 1,
+    'by_location': 3,
+    'by_location_json': 1,
+    'nearby': 3,
+}
+
+
+async def load_samples(session: AsyncSession) -> dict:
+    """Pick representative parameters from the data set."""
+    organization_id, name = (
+        await session.execute(
+            select(Organization.id, Organization.name).order_by(func.random()).limit(1),
+        )
+    ).one()
+    # Здание с наибольшим числом организаций - худший случай для /building
+    building_id = await session.scalar(
+        select(Organization.building_id)
+        .group_by(Organization.building_id)
+        .order_by(func.count().desc())
+        .limit(1),
+    )
+    lon, lat = (
+        await session.execute(
+            select(Building.longitude, Building.latitude).where(Building.id == building_id),
+        )
+    ).one()
+    tree = await activity_tree_cache.get(session)
+    word = max(name.replace('"', ' ').split(), key=len)
+
+    return {
+        'organization_id': organization_id,
+        'building_id': building_id,
+        'activity_id': tree.roots[0],
+        'name': word,
+        'lon': lon,
+        'lat': lat,
+    }
+
+
+def build_scenarios(samples: dict, limit: int, box: float) -> dict[str, Scenario]:
+    bbox = {
+        'min_lon': samples['lon'] - box,
+        'min_lat': samples['lat'] - box,
+        'max_lon': samples['lon'] + box,
+        'max_lat': samples['lat'] + box,
+    }
+    return {
+        'by_id': lambda session: organizations_service.get_organization_by_id(
+            samples['organization_id'],
+            session,
+        ),
+        'by_name': lambda session: organizations_service.get_organizations_by_name(
+            name=samples['name'],
+            mode=NameSearchMode.FUZZY,
+            threshold=organizations_service.DEFAULT_SIMILARITY_THRESHOLD,
+            cursor=None,
+            limit=limit,
+            session=session,
+        ),
+        'by_building': lambda session: organizations_service.get_organizations_by_building(
+            samples['building_id'],
+            None,
+            limit,
+            session,
+        ),
+        'by_activity': lambda session: organizations_service.get_organizations_by_activity(
+            samples['activity_id'],
+            None,
+            limit,
+            session,
+        ),
+        'by_activity_json': lambda session: (
+            organizations_service.get_organizations_by_activity_json(
+                samples['activity_id'],
+                None,
+                limit,
+                session,
+            )
+        ),
+        'by_location': lambda session: organizations_service.get_organizations_by_geolocation(
+            **bbox,
+            cursor=None,
+            limit=limit,
+            session=session,
+        ),
+        'by_location_json': lambda session: (
+            organizations_service.get_organizations_by_geolocation_json(
+                **bbox,
+                cursor=None,
+                limit=limit,
+                session=session,
+            )
+        ),
+        'nearby': lambda session: organizations_service.get_organizations_nearby(
+            lat=samples['lat'],
+            lon=samples['lon'],
+            radius_m=box * 111_000,
+            k=None,
+            cursor=None,
+            limit=limit,
+            session=session,
+        ),
+    }
+
+
+async def run_scenario(
+    scenario: Scenario,
+    iterations: int,
+    warmup: int,
+    budget: int | None,
+) -> dict:
+    counter = StatementCounter()
+    durations = []
+    statements = []
+    with counter.attached(async_engine.sync_engine):
+        for iteration in range(warmup + iterations):
+            counter.count = 0
+            started = time.perf_counter()
+            async with read_session_factory() as session:
+                await scenario(session)
+            elapsed = time.perf_counter() - started
+            if iteration >= warmup:
+                durations.append(elapsed)
+                statements.append(counter.count)
+
+    result = {**summarize(durations), 'statements_per_call': max(statements, default=0)}
+    if budget is not None:
+        result['statement_budget'] = budget
+    return result
+
+
+def serialization_strategies() -> dict[str, Callable[[dict], bytes]]:
+    """Ways to encode a page of ORM organizations, the one the API uses first."""
+    adapter = TypeAdapter(Page[OrganizationOut])
+
+    def shape(page: dict) -> dict:
+        return {**page, 'items': [organization_item(item) for item in page['items']]}
+
+    strategies = {
+        # Сервисы отдают словари по схеме, ответ кодируется pydantic_core.to_json без валидации
+        'serialization': lambda page: dump_json(shape(page)),
+        # Поведение FastAPI по умолчанию: валидация response_model из ORM и dump_json
+        'serialization_validated': lambda page: adapter.dump_json(
+            adapter.validate_python(page, from_attributes=True),
+        ),
+        'serialization_stdlib': lambda page: json.dumps(shape(page)).encode(),
+    }
+    try:
+        import orjson  # noqa: PLC0415
+    except ImportError:
+        pass
+    else:
+        strategies['serialization_orjson'] = lambda page: orjson.dumps(shape(page))
+    return strategies
+
+
+async def run_serialization(limit: int, iterations: int) -> dict[str, dict]:
+    """Time JSON encoding of an already loaded page with every strategy."""
+    async with read_session_factory() as session:
+        rows = (
+            await session.execute(
+                select(Organization)
+                .options(*organizations_service.ORGANIZATION_LOAD_OPTIONS)
+                .order_by(Organization.id)
+                .limit(limit),
+            )
+        ).scalars()
+        page = {'items': rows.all(), 'next_cursor': None}
+
+    results = {}
+    for name, encode in serialization_strategies().items():
+        durations = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            encode(page)
+            durations.append(time.perf_counter() - started)
+        results[name] = {**summarize(durations), 'items': len(page['items'])}
+    return results
+
+
+async def run_coordinates(size: int, iterations: int) -> dict[str, dict]:
+    """Time loading building points as GeoJSON: WKB through shapely against ST_X/ST_Y."""
+
+    async def wkb(session: AsyncSession) -> list[dict]:
+        rows = await session.execute(
+            select(Building.geolocation).order_by(Building.id).limit(size),
+        )
+        # Так схема разбирала точку до перехода на колонки longitude/latitude
+        return [dump_geom(geolocation) for (geolocation,) in rows]
+
+    async def floats(session: AsyncSession) -> list[dict]:
+        rows = await session.execute(
+            select(Building.longitude, Building.latitude).order_by(Building.id).limit(size),
+        )
+        return [{'type': 'Point', 'coordinates': [lon, lat]} for lon, lat in rows]
+
+    results = {}
+    points = {}
+    for name, load in {'coordinates_wkb': wkb, 'coordinates_st_xy': floats}.items():
+        durations = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            async with read_session_factory() as session:
+                points[name] = await load(session)
+            durations.append(time.perf_counter() - started)
+        results[name] = {**summarize(durations), 'items': len(points[name])}
+
+    # shapely отдаёт координаты кортежем, сравниваются сами числа
+    wkb_points, float_points = (
+        [tuple(point['coordinates']) for point in points[name]]
+        for name in ('coordinates_wkb', 'coordinates_st_xy')
+    )
+    if wkb_points != float_points:
+        raise RuntimeError('WKB and ST_X/ST_Y coordinates differ')
+    return results
+
+
+def synthetic_activities(first_id: int, fanout: list[int]) -> list[dict]:
+    """Rows of a tree with fanout[i] children per node on level i, roots first."""
+    rows = []
+    parents = [None]
+    next_id = first_id
+    for count in fanout:
+        level = []
+        for parent_id in parents:
+            for _ in range(count):
+                rows.append({'id': next_id, 'parent_id': parent_id, 'name': f'Bench {next_id}'})
+                level.append(next_id)
+                next_id += 1
+        parents = level
+    return rows
+
+
+async def run_activity_tree(fanout: list[int], iterations: int) -> dict[str, dict]:
+    """Time descendants of a root through the closure table and a recursive CTE."""
+    async with async_session_factory() as session:
+        try:
+            first_id = (await session.scalar(select(func.max(Activity.id))) or 0) + 1
+            rows = synthetic_activities(first_id, fanout)
+            await session.execute(insert(Activity), rows)
+
+            subtree = select(Activity.id).where(Activity.id == first_id).cte(recursive=True)
+            subtree = subtree.union_all(
+                select(Activity.id).join(subtree, Activity.parent_id == subtree.c.id),
+            )
+            queries = {
+                'activity_tree_closure': select(activity_closure.c.descendant_id).where(
+                    activity_closure.c.ancestor_id == first_id,
+                ),
+                'activity_tree_cte': select(subtree.c.id),
+            }
+
+            results = {}
+            descendants = {}
+            for name, query in queries.items():
+                durations = []
+                for _ in range(iterations):
+                    started = time.perf_counter()
+                    ids = (await session.scalars(query)).all()
+                    durations.append(time.perf_counter() - started)
+                descendants[name] = set(ids)
+                results[name] = {**summarize(durations), 'items': len(ids), 'activities': len(rows)}
+        finally:
+            # Синтетическое дерево не остаётся в базе
+            await session.rollback()
+
+    if len({frozenset(ids) for ids in descendants.values()}) != 1:
+        raise RuntimeError('Closure table and recursive CTE disagree on descendants')
+    return results
+
+
+async def main(args: argparse.Namespace) -> int:
+    # Как в приложении: дерево обновляется по NOTIFY и не перепроверяется на каждый вызов
+    await activity_tree_cache.start()
+    async with read_session_factory() as session:
+        samples = await load_samples(session)
+
+    results = {}
+    for name, scenario in build_scenarios(samples, args.limit, args.box).items():
+        if args.only and name not in args.only:
+            continue
+        results[name] = await run_scenario(
+            scenario,
+            args.iterations,
+            args.warmup,
+            STATEMENT_BUDGETS.get(name),
+        )
+
+    if not args.only or 'serialization' in args.only:
+        results |= await run_serialization(
+            args.serialization_size,
+            max(1, args.iterations // 10),
+        )
+
+    if not args.only or 'coordinates' in args.only:
+        results |= await run_coordinates(args.coordinates_size, max(1, args.iterations // 10))
+
+    if not args.only or 'activity_tree' in args.only:
+        results |= await run_activity_tree(args.tree_fanout, args.iterations)
+
+    await activity_tree_cache.stop()
+    await async_engine.dispose()
+    write_report(args.output, 'service', results, {**vars(args), 'samples': samples})
+
+    exceeded = over_budget(results)
+    if exceeded:
+        print(f'Over statement budget: {", ".join(exceeded)}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--limit', type=int, default=500, help='Page size for list scenarios')
+    parser.add_argument('--box', type=float, default=0.05, help='Half-size of bbox, degrees')
+    parser.add_argument('--serialization-size', type=int, default=10_000)
+    parser.add_argument('--coordinates-size', type=int, default=10_000)
+    parser.add_argument(
+        '--tree-fanout',
+        type=int,
+        nargs=3,
+        default=[22, 21, 21],
+        help='Children per node on each level of the synthetic activity tree',
+    )
+    parser.add_argument('--only', nargs='*', help='Run only the named scenarios')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,212 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any, Protocol
+from urllib.parse import urlencode
+
+from db import READ_PRIMARY_INFO, REPLICA_INFO, REPLICA_STICKINESS
+from fastapi import Request, Response
+from serialization import dump_json
+from sqlalchemy.ext.asyncio import AsyncSession
+
+ORGANIZATIONS_NAMESPACE = 'organizations'
+TILES_NAMESPACE = 'tiles'
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> bytes | None: ...
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+    async def incr(self, key: str) -> int: ...
+
+    async def get_counter(self, key: str) -> int: ...
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with TTL and a bound on the number of entries."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        # Счётчики поколений хранятся отдельно: они не вытесняются и не устаревают
+        self._counters: dict[str, int] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+
+class RedisCacheBackend:
+    """Redis (or any RESP-compatible server) backend, shared between workers."""
+
+    def __init__(self, url: str) -> None:
+        try:
+            from redis import asyncio as redis  # noqa: PLC0415
+        except ImportError as e:
+            raise RuntimeError('Install the "redis" extra to use a Redis cache backend') from e
+
+        self._client = redis.from_url(url)
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self._client.set(key, value, px=int(ttl * 1000))
+
+    async def incr(self, key: str) -> int:
+        return await self._client.incr(key)
+
+    async def get_counter(self, key: str) -> int:
+        return int(await self._client.get(key) or 0)
+
+
+class ResponseCache:
+    """Cache of pre-serialized JSON responses.
+
+    Keys are grouped into namespaces. Every namespace has a generation counter
+    that is part of the key, so invalidating a namespace is a single increment
+    and stale entries simply age out.
+
+    Reads of a client that has just written bypass the cache, and for
+    REPLICA_STICKINESS seconds after an invalidation responses read from a
+    replica are not stored: the replica may not have the write yet.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float) -> None:
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> 'ResponseCache':
+        url = os.environ.get('CACHE_URL')
+        if url:
+            backend = RedisCacheBackend(url)
+        else:
+            backend = MemoryCacheBackend(int(os.environ.get('CACHE_MAX_ENTRIES', '1024')))
+        return cls(backend, float(os.environ.get('CACHE_TTL', '60')))
+
+    @staticmethod
+    def key(endpoint: str, **params: Any) -> str:
+        query = urlencode(
+            sorted((name, value) for name, value in params.items() if value is not None),
+        )
+        return f'{endpoint}?{query}'
+
+    async def get_or_set(
+        self,
+        namespace: str,
+        key: str,
+        produce: Callable[[], Awaitable[bytes]],
+        session: AsyncSession,
+    ) -> bytes:
+        if session.info.get(READ_PRIMARY_INFO):
+            return await produce()
+
+        # Поколение читается один раз: если пространство инвалидируют, пока мы
+        # загружаем данные, результат попадёт в старое поколение и не будет виден
+        versioned_key = await self._versioned_key(namespace, key)
+        value = await self.backend.get(versioned_key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = await produce()
+        if not (session.info.get(REPLICA_INFO) and await self._recently_invalidated(namespace)):
+            await self.backend.set(versioned_key, value, self.ttl)
+        return value
+
+    async def invalidate(self, *namespaces: str) -> None:
+        for namespace in namespaces:
+            self.invalidations += 1
+            await self.backend.incr(f'generation:{namespace}')
+            if REPLICA_STICKINESS > 0:
+                await self.backend.set(f'invalidated:{namespace}', b'1', REPLICA_STICKINESS)
+
+    def stats(self) -> dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'invalidations': self.invalidations}
+
+    async def _recently_invalidated(self, namespace: str) -> bool:
+        return await self.backend.get(f'invalidated:{namespace}') is not None
+
+    async def _versioned_key(self, namespace: str, key: str) -> str:
+        generation = await self.backend.get_counter(f'generation:{namespace}')
+        return f'{namespace}:{generation}:{key}'
+
+
+response_cache = ResponseCache.from_env()
+
+
+async def cached_json(
+    namespace: str,
+    key: str,
+    load: Callable[[], Awaitable[Any]],
+    session: AsyncSession,
+) -> bytes:
+    """Return cached JSON bytes for the key or load, serialize and store them.
+
+    load must return data already shaped like the response schema and read
+    through session, which decides whether the cache may be used.
+    """
+
+    async def produce() -> bytes:
+        return dump_json(await load())
+
+    return await response_cache.get_or_set(namespace, key, produce, session)
+
+
+async def cached_json_response(
+    namespace: str,
+    key: str,
+    load: Callable[[], Awaitable[Any]],
+    session: AsyncSession,
+) -> Response:
+    content = await cached_json(namespace, key, load, session)
+    return Response(content=content, media_type='application/json')
+
+
+def etag_response(
+    content: bytes,
+    request: Request,
+    media_type: str = 'application/json',
+) -> Response:
+    """Respond with an ETag of the content, or 304 if the client already has it."""
+    etag = f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+    # Клиент обязан перепроверять ответ, но может не скачивать его повторно
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        candidates = {value.strip().removeprefix('W/') for value in if_none_match.split(',')}
+        if etag in candidates or '*' in candidates:
+            return Response(status_code=304, headers=headers)
+
+    return Response(content=content, media_type=media_type, headers=headers)
@@ -1,21 +1,224 @@
+import itertools
+import logging
 import os
+import time
 from typing import Annotated
 
-from fastapi import Depends
+from fastapi import Depends, Request, Response
 from sqlalchemy import create_engine
-from sqlalchemy.orm import Session
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, PoolProxiedConnection
+
+logger = logging.getLogger(__name__)
+
+DATABASE_URL = make_url(os.environ.get('DATABASE_URL'))
+# Реплики для чтения через запятую, без них все запросы идут в основную БД
+DATABASE_READ_URLS = [
+    make_url(url.strip())
+    for url in os.environ.get('DATABASE_READ_URLS', '').split(',')
+    if url.strip()
+]
+# Сколько секунд не обращаться к реплике после ошибки подключения
+REPLICA_RETRY_AFTER = float(os.environ.get('REPLICA_RETRY_AFTER', '30'))
+REPLICA_CONNECT_TIMEOUT = float(os.environ.get('REPLICA_CONNECT_TIMEOUT', '2'))
+# Сколько секунд после записи клиент читает из основной БД (read-your-writes)
+REPLICA_STICKINESS = int(os.environ.get('REPLICA_STICKINESS', '5'))
+PRIMARY_COOKIE = 'read_primary'
+# Метки в session.info: чтение из основной БД после записи клиента и чтение с реплики
+READ_PRIMARY_INFO = 'read_primary'
+REPLICA_INFO = 'replica'
 
+# Пул соединений асинхронных движков (значения по умолчанию как в SQLAlchemy)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', '-1'))
+DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'false').lower() in {'1', 'true', 'yes'}
+# Ограничение времени выполнения запроса в миллисекундах, 0 - без ограничения
+DB_STATEMENT_TIMEOUT = int(os.environ.get('DB_STATEMENT_TIMEOUT', '0'))
+# Чтения обходятся без снимка на всю транзакцию, запись - с ним
+DB_READ_ISOLATION_LEVEL = os.environ.get('DB_READ_ISOLATION_LEVEL', 'READ COMMITTED')
+DB_WRITE_ISOLATION_LEVEL = os.environ.get('DB_WRITE_ISOLATION_LEVEL', 'REPEATABLE READ')
+
+# Синхронный движок используется alembic и скриптами наполнения БД
 engine = create_engine(
-    os.environ.get('DATABASE_URL'),
+    DATABASE_URL,
     execution_options={
         'isolation_level': 'REPEATABLE READ',
     },
 )
 
 
-def get_session():
-    with Session(engine) as session:
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that tracks checkouts blocked on an exhausted pool and how long they wait.
+
+    Only checkouts that find no idle connection with the overflow used up are
+    counted as waits; opening a new connection is not waiting on the pool.
+    """
+
+    def __init__(self, *args, max_overflow: int = 10, **kwargs) -> None:
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        self.max_overflow = max_overflow
+        self.waiting = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def connect(self) -> PoolProxiedConnection:
+        self.checkouts += 1
+        return super().connect()
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        # Отрицательный max_overflow снимает ограничение на число соединений
+        exhausted = (
+            self.max_overflow >= 0
+            and self.checkedin() == 0
+            and self.checkedout() >= self.size() + self.max_overflow
+        )
+        if not exhausted:
+            return super()._do_get()
+
+        self.waiting += 1
+        self.waits += 1
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            elapsed = time.perf_counter() - started
+            self.waiting -= 1
+            self.wait_seconds_total += elapsed
+            self.wait_seconds_max = max(self.wait_seconds_max, elapsed)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            'size': self.size(),
+            'checked_out': self.checkedout(),
+            'checked_in': self.checkedin(),
+            'overflow': self.overflow(),
+            'waiting': self.waiting,
+            'checkouts': self.checkouts,
+            'waits': self.waits,
+            'wait_seconds_total': self.wait_seconds_total,
+            'wait_seconds_max': self.wait_seconds_max,
+        }
+
+
+def _create_async_engine(url: URL, **connect_args) -> AsyncEngine:
+    if DB_STATEMENT_TIMEOUT:
+        connect_args['server_settings'] = {'statement_timeout': str(DB_STATEMENT_TIMEOUT)}
+
+    return create_async_engine(
+        url.set(drivername='postgresql+asyncpg'),
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+def _read_session_factory(bind: AsyncEngine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind.execution_options(
+            isolation_level=DB_READ_ISOLATION_LEVEL,
+            postgresql_readonly=True,
+        ),
+        expire_on_commit=False,
+    )
+
+
+# Асинхронный движок (asyncpg) для обработчиков FastAPI
+async_engine = _create_async_engine(DATABASE_URL)
+
+# Сессии для записи и для чтения используют один пул, но разные уровни изоляции
+async_session_factory = async_sessionmaker(
+    async_engine.execution_options(isolation_level=DB_WRITE_ISOLATION_LEVEL),
+    expire_on_commit=False,
+)
+read_session_factory = _read_session_factory(async_engine)
+
+
+class ReplicaRouter:
+    """Round-robin over read replicas.
+
+    A replica that fails to connect is skipped for REPLICA_RETRY_AFTER seconds;
+    when no replica is available reads fall back to the primary.
+    """
+
+    def __init__(self, urls: list[URL]) -> None:
+        self.engines = [_create_async_engine(url, timeout=REPLICA_CONNECT_TIMEOUT) for url in urls]
+        self.replicas = [_read_session_factory(engine) for engine in self.engines]
+        self._order = itertools.cycle(range(len(self.replicas)))
+        self._unavailable_until = [0.0] * len(self.replicas)
+
+    async def open_session(self) -> AsyncSession:
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            index = next(self._order)
+            if self._unavailable_until[index] > now:
+                continue
+
+            session = self.replicas[index]()
+            try:
+                # Подключаемся сразу, чтобы недоступная реплика не сорвала запрос
+                await session.connection()
+            except (OSError, DBAPIError):
+                await session.close()
+                logger.warning('Read replica #%d is unavailable', index, exc_info=True)
+                self._unavailable_until[index] = now + REPLICA_RETRY_AFTER
+                continue
+            session.info[REPLICA_INFO] = True
+            return session
+
+        return read_session_factory()
+
+    async def dispose(self) -> None:
+        for engine in self.engines:
+            await engine.dispose()
+
+
+replica_router = ReplicaRouter(DATABASE_READ_URLS)
+
+
+async def open_read_session(read_primary: bool) -> AsyncSession:
+    """Open a read session on the primary if the client has just written, else on a replica."""
+    # Клиент недавно писал: реплика может ещё не догнать основную БД
+    if read_primary:
+        session = read_session_factory()
+        session.info[READ_PRIMARY_INFO] = True
+        return session
+    return await replica_router.open_session()
+
+
+async def get_read_session(request: Request):
+    session = await open_read_session(bool(request.cookies.get(PRIMARY_COOKIE)))
+    async with session:
+        yield session
+
+
+async def get_write_session(response: Response):
+    if replica_router.replicas:
+        response.set_cookie(
+            PRIMARY_COOKIE,
+            '1',
+            max_age=REPLICA_STICKINESS,
+            httponly=True,
+            samesite='lax',
+        )
+
+    async with async_session_factory() as session:
         yield session
 
 
-SessionDep = Annotated[Session, Depends(get_session)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
+WriteSessionDep = Annotated[AsyncSession, Depends(get_write_session)]
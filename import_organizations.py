@@ -0,0 +1,55 @@
+"""Import organizations from an NDJSON file.
+
+Every line is an `OrganizationCreate` object, e.g.
+{"name": "Cafe", "building_id": 1, "phones": ["+1-555-0101"], "activities": [12]}
+"""
+
+import argparse
+import asyncio
+import sys
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+from db import async_engine, async_session_factory
+from services.import_service import BULK_BATCH_SIZE, import_organizations, iter_lines
+
+READ_CHUNK_SIZE = 1 << 16
+
+
+async def read_chunks(path: str) -> AsyncIterator[bytes]:
+    """Read the file (or stdin for "-") in chunks without loading it whole."""
+    if path == '-':
+        stream = sys.stdin.buffer
+    else:
+        # Файл открывается в потоке, как и читается: open() блокирует цикл событий
+        stream = await asyncio.to_thread(Path(path).open, 'rb')
+    try:
+        while chunk := await asyncio.to_thread(stream.read, READ_CHUNK_SIZE):
+            yield chunk
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+
+
+async def run(path: str, batch_size: int) -> int:
+    async with async_session_factory() as session:
+        result = await import_organizations(iter_lines(read_chunks(path)), session, batch_size)
+    await async_engine.dispose()
+
+    for error in result['errors']:
+        print(f'line {error["line"]}: {error["detail"]}', file=sys.stderr)
+    print(f'Created {result["created"]} organizations, {len(result["errors"])} rows failed')
+    return 1 if result['errors'] else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='NDJSON file to import, "-" for stdin')
+    parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE)
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.path, args.batch_size)))
+
+
+if __name__ == '__main__':
+    main()
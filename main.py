@@ -1,6 +1,44 @@
+from contextlib import asynccontextmanager
+
+from db import async_engine, replica_router
 from fastapi import FastAPI
+from metrics import MetricsMiddleware, instrument_engine
+from profiling import (
+    PROFILING_ENABLED,
+    SLOW_QUERY_MS,
+    ProfilerMiddleware,
+    install_slow_query_log,
+)
+from router.activity_router import activity_router
+from router.buildings_router import buildings_router
+from router.metrics_router import metrics_router
 from router.organizations_router import organizations_router
+from router.tiles_router import tiles_router
+from services.activity_service import activity_tree_cache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await activity_tree_cache.start()
+    yield
+    await activity_tree_cache.stop()
+    await replica_router.dispose()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+for instrumented in (async_engine, *replica_router.engines):
+    instrument_engine(instrumented.sync_engine)
+    if SLOW_QUERY_MS:
+        install_slow_query_log(instrumented)
 
-app = FastAPI()
+# Без PROFILING_ENABLED заголовок X-Profile игнорируется и ничего не стоит
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilerMiddleware)
 
 app.include_router(organizations_router)
+app.include_router(buildings_router)
+app.include_router(activity_router)
+app.include_router(tiles_router)
+app.include_router(metrics_router)
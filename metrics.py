@@ -0,0 +1,258 @@
+"""Prometheus metrics for requests, SQL statements and serialization.
+
+Metrics live in the process: with several workers every worker exposes its
+own numbers, as with the in-memory response cache.
+"""
+
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1_024, 4_096, 16_384, 65_536, 262_144, 1_048_576, 4_194_304, 16_777_216)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 4, 5, 10, 20, 50, 100)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(labels: tuple[tuple[str, str], ...]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if value == int(value) else repr(float(value))
+
+
+def _label_key(labels: dict[str, str]) -> tuple[tuple[str, str], ...]:
+    return tuple(sorted(labels.items()))
+
+
+class Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str) -> None:
+        self.name = name
+        self.documentation = documentation
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.kind}'
+        yield from self.samples()
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Counter changed with inc() or read from a callback at scrape time.
+
+    The callback returns a mapping of label dicts, as tuples of pairs, to values.
+    """
+
+    kind = 'counter'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], dict[tuple, float]] | None = None,
+    ) -> None:
+        super().__init__(name, documentation)
+        self._values: dict[tuple, float] = {}
+        self._collect = collect
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = _label_key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        values = self._collect() if self._collect is not None else self._values
+        for labels, value in sorted(values.items()):
+            yield f'{self.name}{_format_labels(labels)} {_format_value(value)}'
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets: tuple[float, ...]) -> None:
+        super().__init__(name, documentation)
+        self.buckets = buckets
+        # Для каждого набора меток: число наблюдений по корзинам, сумма и количество
+        self._series: dict[tuple, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = _label_key(labels)
+        counts, totals = self._series.setdefault(key, ([0] * len(self.buckets), [0.0, 0]))
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[index] += 1
+                break
+        totals[0] += value
+        totals[1] += 1
+
+    def samples(self) -> Iterator[str]:
+        for labels, (counts, (total, count)) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts, strict=True):
+                cumulative += bucket_count
+                bucket_labels = (*labels, ('le', _format_value(bound)))
+                yield f'{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}'
+            yield f'{self.name}_bucket{_format_labels((*labels, ("le", "+Inf")))} {int(count)}'
+            yield f'{self.name}_sum{_format_labels(labels)} {_format_value(total)}'
+            yield f'{self.name}_count{_format_labels(labels)} {int(count)}'
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: list[Metric] = []
+
+    def register[MetricT: Metric](self, metric: MetricT) -> MetricT:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(line for metric in self.metrics for line in metric.render()) + '\n'
+
+
+registry = Registry()
+
+requests_in_flight = registry.register(
+    Gauge('http_requests_in_flight', 'Requests currently being handled'),
+)
+request_duration = registry.register(
+    Histogram(
+        'http_request_duration_seconds',
+        'Request latency by route',
+        LATENCY_BUCKETS,
+    ),
+)
+response_size = registry.register(
+    Histogram('http_response_size_bytes', 'Response body size by route', SIZE_BUCKETS),
+)
+request_statements = registry.register(
+    Histogram(
+        'db_statements_per_request',
+        'SQL statements executed per request by route',
+        STATEMENT_BUCKETS,
+    ),
+)
+request_db_time = registry.register(
+    Histogram(
+        'db_time_per_request_seconds',
+        'Cumulative SQL execution time per request by route',
+        LATENCY_BUCKETS,
+    ),
+)
+request_serialization_time = registry.register(
+    Histogram(
+        'serialization_time_per_request_seconds',
+        'Time spent encoding response bodies per request by route',
+        LATENCY_BUCKETS,
+    ),
+)
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_seconds: float = 0.0
+    serialization_seconds: float = 0.0
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar('request_stats', default=None)
+
+
+@contextmanager
+def measure_serialization() -> Iterator[None]:
+    """Attribute the time spent in the block to serialization of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.serialization_seconds += time.perf_counter() - started
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info['query_started'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.pop('query_started', None)
+    stats = _request_stats.get()
+    if stats is not None and started is not None:
+        stats.statements += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count statements and DB time of the current request on this engine."""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, sizes and SQL usage.
+
+    Routes are labelled by their path template, so /organizations/{gid} is one
+    series no matter how many ids are requested.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status = 500
+        size = 0
+
+        async def send_wrapper(message) -> None:
+            nonlocal status, size
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body':
+                size += len(message.get('body', b''))
+            await send(message)
+
+        started = time.perf_counter()
+        requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_flight.dec()
+            _request_stats.reset(token)
+
+            route = scope.get('route')
+            labels = {
+                'method': scope['method'],
+                'route': getattr(route, 'path', 'unmatched'),
+            }
+            request_duration.observe(elapsed, **labels, status=str(status))
+            response_size.observe(size, **labels)
+            request_statements.observe(stats.statements, **labels)
+            request_db_time.observe(stats.db_seconds, **labels)
+            request_serialization_time.observe(stats.serialization_seconds, **labels)
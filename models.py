@@ -1,6 +1,27 @@
-from geoalchemy2 import Geography
-from sqlalchemy import Column, ForeignKey, Integer, String, Table
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+from geoalchemy2 import Geography, Geometry
+from sqlalchemy import (
+    BigInteger,
+    CheckConstraint,
+    Column,
+    ForeignKey,
+    Index,
+    Integer,
+    SmallInteger,
+    String,
+    Table,
+    cast,
+    func,
+    text,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import (
+    DeclarativeBase,
+    Mapped,
+    column_property,
+    deferred,
+    mapped_column,
+    relationship,
+)
 
 
 class Base(DeclarativeBase):
@@ -14,22 +35,76 @@ class Activity(Base):
     parent_id: Mapped[int] = mapped_column(
         ForeignKey('activities.id', ondelete='CASCADE'),
         nullable=True,
+        index=True,
     )
 
     parent: Mapped['Activity'] = relationship('Activity', remote_side=[id], backref='children')
 
 
+# Транзитивное замыкание иерархии видов деятельности (поддерживается триггером)
+activity_closure = Table(
+    'activity_closure',
+    Base.metadata,
+    Column(
+        'ancestor_id',
+        Integer,
+        ForeignKey('activities.id', ondelete='CASCADE'),
+        primary_key=True,
+    ),
+    Column(
+        'descendant_id',
+        Integer,
+        ForeignKey('activities.id', ondelete='CASCADE'),
+        primary_key=True,
+    ),
+    Column('depth', Integer, nullable=False),
+    Index('ix_activity_closure_descendant_id', 'descendant_id', 'depth'),
+)
+
+
+# Версия дерева видов деятельности, увеличивается триггером при любом изменении
+activity_tree_version = Table(
+    'activity_tree_version',
+    Base.metadata,
+    Column('id', SmallInteger, primary_key=True, server_default='1'),
+    Column('version', BigInteger, nullable=False, server_default='0'),
+    CheckConstraint('id = 1', name='activity_tree_version_single_row'),
+)
+
+
 class Building(Base):
     __tablename__ = 'buildings'
+    __table_args__ = (
+        # Для отбора в плоских координатах (тайлы карты)
+        Index(
+            'ix_buildings_geolocation_geometry',
+            text('CAST(geolocation AS geometry(POINT,4326))'),
+            postgresql_using='gist',
+        ),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
     address: Mapped[str] = mapped_column(String(), nullable=False)
-    geolocation = Column(Geography(geometry_type='POINT', srid=4326), nullable=False)
+    # Сама точка в ответах не нужна: координаты читаются колонками longitude/latitude,
+    # поэтому WKB не грузится и не разбирается в shapely на каждой строке
+    geolocation = deferred(Column(Geography(geometry_type='POINT', srid=4326), nullable=False))
+    longitude: Mapped[float] = column_property(
+        func.ST_X(cast(geolocation, Geometry(geometry_type='POINT', srid=4326))),
+    )
+    latitude: Mapped[float] = column_property(
+        func.ST_Y(cast(geolocation, Geometry(geometry_type='POINT', srid=4326))),
+    )
 
     organizations: Mapped[list['Organization']] = relationship(
         'Organization',
         back_populates='building',
+        order_by='Organization.id',
     )
 
+    @property
+    def geo_point(self) -> dict:
+        return {'type': 'Point', 'coordinates': [self.longitude, self.latitude]}
+
 
 # Ассоциация "организация-виды деятельности"
 organization_activity = Table(
@@ -47,12 +122,15 @@ organization_activity = Table(
         ForeignKey('activities.id', ondelete='CASCADE'),
         primary_key=True,
     ),
+    Index('ix_organization_activity_activity_id', 'activity_id', 'organization_id'),
 )
 
 
 # Ассоциация "организация-телефоны"
 class OrganizationPhone(Base):
     __tablename__ = 'organization_phones'
+    __table_args__ = (Index('ix_organization_phones_organization_id', 'organization_id'),)
+
     id: Mapped[int] = mapped_column(primary_key=True)
     organization_id: Mapped[int] = mapped_column(ForeignKey('organizations.id', ondelete='CASCADE'))
     phone_number: Mapped[str] = mapped_column(String(), nullable=False)
@@ -61,20 +139,36 @@ class OrganizationPhone(Base):
 # Модель организации
 class Organization(Base):
     __tablename__ = 'organizations'
+    __table_args__ = (
+        Index('ix_organizations_building_id_id', 'building_id', 'id'),
+        Index(
+            'ix_organizations_name_prefix',
+            text('lower(name) COLLATE "C"'),
+            'id',
+        ),
+        Index('ix_organizations_search_document', 'search_document', postgresql_using='gin'),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(), nullable=False)
     building_id: Mapped[int] = mapped_column(
         ForeignKey('buildings.id', ondelete='CASCADE'),
         nullable=False,
     )
+    # Название, виды деятельности и адрес для полнотекстового поиска (поддерживается триггерами)
+    search_document = deferred(
+        Column(TSVECTOR, nullable=False, server_default=text("''::tsvector")),
+    )
 
     building: Mapped['Building'] = relationship('Building', back_populates='organizations')
     phones: Mapped[list['OrganizationPhone']] = relationship(
         'OrganizationPhone',
         cascade='all, delete-orphan',
+        order_by='OrganizationPhone.id',
     )
     activities: Mapped[list['Activity']] = relationship(
         'Activity',
         secondary=organization_activity,
         backref='organizations',
+        order_by='Activity.id',
     )
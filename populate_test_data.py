@@ -1,460 +1,357 @@
-"""Script to populate database with test data.
+"""Script to populate database with synthetic test data.
 
-Includes nested activities, organizations, and buildings.
+Generates a seeded, reproducible dataset of any size: buildings spread over a
+city- or country-sized area, a 3-level activity tree and organizations with
+phones and activities. Rows are bulk-loaded with COPY.
 """
 
-from sqlalchemy.orm import Session
+import argparse
+import csv
+import io
+import math
+import random
+import time
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+
+from db import engine
+
+# Размеры областей (min_lon, min_lat, max_lon, max_lat)
+AREAS = {
+    'city': (37.35, 55.57, 37.85, 55.91),  # Москва
+    'country': (27.0, 43.0, 60.0, 68.0),  # Европейская часть России
+}
+
+COPY_CHUNK_ROWS = 100_000
+
+STREETS = [
+    'Lenina',
+    'Mira',
+    'Gagarina',
+    'Pushkina',
+    'Sovetskaya',
+    'Tverskaya',
+    'Arbat',
+    'Sadovaya',
+    'Lesnaya',
+    'Shkolnaya',
+    'Naberezhnaya',
+    'Molodezhnaya',
+    'Tsentralnaya',
+    'Zelenaya',
+    'Novaya',
+    'Polevaya',
+]
+STREET_TYPES = ['Street', 'Avenue', 'Lane', 'Boulevard', 'Highway']
+
+ACTIVITY_WORDS = [
+    'Services',
+    'Retail',
+    'Food',
+    'Healthcare',
+    'Education',
+    'Automotive',
+    'Beauty',
+    'Legal',
+    'IT',
+    'Construction',
+    'Logistics',
+    'Finance',
+    'Tourism',
+    'Sports',
+    'Culture',
+]
+
+NAME_PREFIXES = ['OOO', 'IP', 'AO', 'PAO', 'ZAO']
+NAME_WORDS = [
+    'Horns',
+    'Hooves',
+    'Milk',
+    'Meat',
+    'Bread',
+    'Auto',
+    'Stroy',
+    'Tech',
+    'Med',
+    'Invest',
+    'Trade',
+    'Service',
+    'Group',
+    'Plus',
+    'Prom',
+    'Agro',
+    'Soft',
+    'Lux',
+    'Eco',
+    'Nord',
+]
+NAME_SUFFIXES = ['', ' & Co', ' Holding', ' Center', ' Market', ' Studio', ' Lab']
+
+
+@dataclass(frozen=True)
+class Options:
+    seed: int
+    buildings: int
+    organizations: int
+    fanout: tuple[int, int, int]
+    area: tuple[float, float, float, float]
+    max_phones: int
+    max_activities: int
+
+
+def zipf_weights(size: int) -> list[float]:
+    # Реалистичное распределение: несколько слов встречаются часто, остальные редко
+    return [1 / rank for rank in range(1, size + 1)]
+
+
+class CsvChunks:
+    """Encode rows as CSV in chunks to keep memory flat for any dataset size."""
+
+    def __init__(self, rows: Iterable[tuple], chunk_rows: int = COPY_CHUNK_ROWS) -> None:
+        self.rows = iter(rows)
+        self.chunk_rows = chunk_rows
+        self.count = 0
+
+    def __iter__(self) -> Iterator[io.StringIO]:
+        while True:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            written = 0
+            for row in self.rows:
+                writer.writerow(row)
+                written += 1
+                if written >= self.chunk_rows:
+                    break
+
+            if not written:
+                return
+            self.count += written
+            buffer.seek(0)
+            yield buffer
+
+
+def copy_rows(cursor, table: str, columns: list[str], rows: Iterable[tuple]) -> int:
+    statement = f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)'
+    chunks = CsvChunks(rows)
+    for chunk in chunks:
+        cursor.copy_expert(statement, chunk)
+    return chunks.count
+
+
+def generate_activities(options: Options) -> list[list[tuple[int, int | None, str]]]:
+    """Return activity rows grouped by level: (id, parent_id, name)."""
+    rng = random.Random(options.seed)
+    levels = []
+    next_id = 1
+    parents = [(None, '')]
+    for fanout in options.fanout:
+        level = []
+        for parent_id, parent_name in parents:
+            for index in range(fanout):
+                word = rng.choice(ACTIVITY_WORDS)
+                name = f'{parent_name} / {word} {index + 1}' if parent_name else f'{word} {next_id}'
+                level.append((next_id, parent_id, name))
+                next_id += 1
+        levels.append(level)
+        parents = [(activity_id, name) for activity_id, _, name in level]
+    return levels
+
+
+def generate_buildings(options: Options) -> Iterator[tuple[int, str, str]]:
+    rng = random.Random(options.seed + 1)
+    min_lon, min_lat, max_lon, max_lat = options.area
+    # Большая часть зданий сосредоточена вокруг "районов", остальные разбросаны равномерно
+    clusters = [
+        (rng.uniform(min_lon, max_lon), rng.uniform(min_lat, max_lat))
+        for _ in range(max(1, int(math.sqrt(options.buildings) / 4)))
+    ]
+    spread = (max_lon - min_lon) / 50
+
+    for building_id in range(1, options.buildings + 1):
+        if rng.random() < 0.7:
+            center_lon, center_lat = rng.choice(clusters)
+            lon = min(max(rng.gauss(center_lon, spread), min_lon), max_lon)
+            lat = min(max(rng.gauss(center_lat, spread), min_lat), max_lat)
+        else:
+            lon, lat = rng.uniform(min_lon, max_lon), rng.uniform(min_lat, max_lat)
+
+        address = (
+            f'{rng.randint(1, 200)} {rng.choice(STREETS)} {rng.choice(STREET_TYPES)}, '
+            f'building {rng.randint(1, 30)}'
+        )
+        yield building_id, address, f'SRID=4326;POINT({lon:.7f} {lat:.7f})'
 
-from db import get_session
-from models import Activity, Building, Organization, OrganizationPhone
 
+def generate_organizations(
+    options: Options,
+    activity_ids: list[int],
+) -> tuple[Iterator[tuple], Iterator[tuple], Iterator[tuple]]:
+    """Return lazy row generators for organizations, phones and their activities."""
+    word_weights = zipf_weights(len(NAME_WORDS))
 
-def create_activities(session: Session) -> dict[str, Activity]:
-    """Create nested activities with parent-child relationships."""
-    activities = {}
+    def organizations() -> Iterator[tuple[int, str, int]]:
+        rng = random.Random(options.seed + 2)
+        for organization_id in range(1, options.organizations + 1):
+            words = rng.choices(NAME_WORDS, weights=word_weights, k=rng.randint(1, 2))
+            name = f'{rng.choice(NAME_PREFIXES)} "{"-".join(words)}{rng.choice(NAME_SUFFIXES)}"'
+            yield organization_id, name, rng.randint(1, options.buildings)
 
-    # Top-level activities
-    activities['Services'] = Activity(name='Services', parent_id=None)
-    activities['Retail'] = Activity(name='Retail', parent_id=None)
-    activities['Food'] = Activity(name='Food & Dining', parent_id=None)
-    activities['Healthcare'] = Activity(name='Healthcare', parent_id=None)
-    activities['Education'] = Activity(name='Education', parent_id=None)
+    def phones() -> Iterator[tuple[int, str]]:
+        rng = random.Random(options.seed + 3)
+        for organization_id in range(1, options.organizations + 1):
+            for _ in range(rng.randint(0, options.max_phones)):
+                number = rng.randint(0, 9_999_999)
+                yield organization_id, f'+7-9{rng.randint(10, 99)}-{number:07d}'
 
-    session.add_all(activities.values())
-    session.flush()
+    def activities() -> Iterator[tuple[int, int]]:
+        rng = random.Random(options.seed + 4)
+        for organization_id in range(1, options.organizations + 1):
+            count = rng.randint(1, options.max_activities)
+            for activity_id in rng.sample(activity_ids, k=min(count, len(activity_ids))):
+                yield organization_id, activity_id
 
-    # Second level activities
-    activities['Beauty'] = Activity(
-        name='Beauty & Personal Care',
-        parent_id=activities['Services'].id,
-    )
-    activities['Auto'] = Activity(
-        name='Automotive Services',
-        parent_id=activities['Services'].id,
-    )
-    activities['Legal'] = Activity(
-        name='Legal Services',
-        parent_id=activities['Services'].id,
-    )
-    activities['IT'] = Activity(
-        name='IT Services',
-        parent_id=activities['Services'].id,
-    )
+    return organizations(), phones(), activities()
 
-    activities['Supermarket'] = Activity(
-        name='Supermarket',
-        parent_id=activities['Retail'].id,
-    )
-    activities['Clothing'] = Activity(
-        name='Clothing Store',
-        parent_id=activities['Retail'].id,
-    )
-    activities['Electronics'] = Activity(
-        name='Electronics Store',
-        parent_id=activities['Retail'].id,
-    )
 
-    activities['Restaurant'] = Activity(
-        name='Restaurant',
-        parent_id=activities['Food'].id,
-    )
-    activities['Cafe'] = Activity(
-        name='Cafe',
-        parent_id=activities['Food'].id,
-    )
-    activities['FastFood'] = Activity(
-        name='Fast Food',
-        parent_id=activities['Food'].id,
-    )
+def timed(message: str, action: Callable[[], int]) -> int:
+    started = time.perf_counter()
+    count = action()
+    print(f'{message}: {count} rows in {time.perf_counter() - started:.1f}s')
+    return count
 
-    activities['Hospital'] = Activity(
-        name='Hospital',
-        parent_id=activities['Healthcare'].id,
-    )
-    activities['Pharmacy'] = Activity(
-        name='Pharmacy',
-        parent_id=activities['Healthcare'].id,
-    )
-    activities['Dentist'] = Activity(
-        name='Dental Clinic',
-        parent_id=activities['Healthcare'].id,
-    )
-
-    activities['School'] = Activity(
-        name='School',
-        parent_id=activities['Education'].id,
-    )
-    activities['University'] = Activity(
-        name='University',
-        parent_id=activities['Education'].id,
-    )
-
-    session.add_all(
-        [
-            activities['Beauty'],
-            activities['Auto'],
-            activities['Legal'],
-            activities['IT'],
-            activities['Supermarket'],
-            activities['Clothing'],
-            activities['Electronics'],
-            activities['Restaurant'],
-            activities['Cafe'],
-            activities['FastFood'],
-            activities['Hospital'],
-            activities['Pharmacy'],
-            activities['Dentist'],
-            activities['School'],
-            activities['University'],
-        ],
-    )
-    session.flush()
-
-    # Third level activities (nested deeper)
-    activities['HairSalon'] = Activity(
-        name='Hair Salon',
-        parent_id=activities['Beauty'].id,
-    )
-    activities['NailSalon'] = Activity(
-        name='Nail Salon',
-        parent_id=activities['Beauty'].id,
-    )
-    activities['Spa'] = Activity(
-        name='Spa & Wellness',
-        parent_id=activities['Beauty'].id,
-    )
-
-    activities['CarRepair'] = Activity(
-        name='Car Repair Shop',
-        parent_id=activities['Auto'].id,
-    )
-    activities['CarWash'] = Activity(
-        name='Car Wash',
-        parent_id=activities['Auto'].id,
-    )
-
-    activities['LawFirm'] = Activity(
-        name='Law Firm',
-        parent_id=activities['Legal'].id,
-    )
-    activities['Notary'] = Activity(
-        name='Notary Public',
-        parent_id=activities['Legal'].id,
-    )
 
-    activities['Software'] = Activity(
-        name='Software Development',
-        parent_id=activities['IT'].id,
-    )
-    activities['Hardware'] = Activity(
-        name='Hardware Support',
-        parent_id=activities['IT'].id,
-    )
-
-    # Fourth level (very nested)
-    activities['BarberShop'] = Activity(
-        name='Barber Shop',
-        parent_id=activities['HairSalon'].id,
-    )
-    activities['WomenHair'] = Activity(
-        name='Women Hair Salon',
-        parent_id=activities['HairSalon'].id,
-    )
-
-    session.add_all(
-        [
-            activities['HairSalon'],
-            activities['NailSalon'],
-            activities['Spa'],
-            activities['CarRepair'],
-            activities['CarWash'],
-            activities['LawFirm'],
-            activities['Notary'],
-            activities['Software'],
-            activities['Hardware'],
-            activities['BarberShop'],
-            activities['WomenHair'],
-        ],
-    )
-    session.commit()
-    # Refresh all activities to ensure they're up to date
-    for activity in activities.values():
-        session.refresh(activity)
-
-    return activities
-
-
-def create_buildings(session: Session) -> list[Building]:
-    """Create buildings in different areas with geolocations."""
-    # Using WKT format for geography points (POINT(longitude latitude))
-    buildings_data = [
-        {
-            'address': '123 Main Street, Downtown',
-            'geolocation': 'POINT(-122.4194 37.7749)',  # San Francisco
-        },
-        {
-            'address': '456 Oak Avenue, Central District',
-            'geolocation': 'POINT(-122.4195 37.7750)',
-        },
-        {
-            'address': '789 Pine Street, Business District',
-            'geolocation': 'POINT(-122.4196 37.7751)',
-        },
-        {
-            'address': '321 Elm Road, Residential Area',
-            'geolocation': 'POINT(-122.4200 37.7760)',
-        },
-        {
-            'address': '654 Maple Drive, Shopping District',
-            'geolocation': 'POINT(-122.4180 37.7740)',
-        },
-        {
-            'address': '987 Cedar Lane, University District',
-            'geolocation': 'POINT(-122.4210 37.7770)',
-        },
-        {
-            'address': '147 Birch Way, Medical District',
-            'geolocation': 'POINT(-122.4220 37.7780)',
-        },
-        {
-            'address': '258 Spruce Court, Tech Hub',
-            'geolocation': 'POINT(-122.4170 37.7730)',
-        },
-        {
-            'address': '369 Willow Street, Entertainment Zone',
-            'geolocation': 'POINT(-122.4230 37.7790)',
-        },
-        {
-            'address': '741 Ash Boulevard, Industrial Area',
-            'geolocation': 'POINT(-122.4240 37.7800)',
-        },
-    ]
+def populate(options: Options, *, clear: bool) -> None:
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM activities), EXISTS (SELECT 1 FROM buildings)')
+        if any(cursor.fetchone()):
+            if not clear:
+                response = input(
+                    'Database already contains data. '
+                    'Do you want to clear it and start fresh? (yes/no): ',
+                )
+                if response.lower() != 'yes':
+                    print('Keeping existing data. Exiting.')
+                    return
+
+            print('Clearing existing data...')
+            cursor.execute(
+                'TRUNCATE organization_phones, organization_activity, organizations, '
+                'buildings, activities RESTART IDENTITY CASCADE',
+            )
 
-    buildings = []
-    for data in buildings_data:
-        building = Building(
-            address=data['address'],
-            geolocation=data['geolocation'],
+        levels = generate_activities(options)
+        timed(
+            'Activities',
+            lambda: copy_rows(
+                cursor,
+                'activities',
+                ['id', 'parent_id', 'name'],
+                (row for level in levels for row in level),
+            ),
         )
-        buildings.append(building)
-        session.add(building)
-
-    session.commit()
-    # Refresh all buildings to ensure they're up to date
-    for building in buildings:
-        session.refresh(building)
-    return buildings
-
-
-def create_organizations(
-    session: Session,
-    activities: dict[str, Activity],
-    buildings: list[Building],
-) -> list[Organization]:
-    """Create organizations with various activities and phone numbers."""
-    organizations_data = [
-        {
-            'name': 'Downtown Beauty Center',
-            'building_index': 0,
-            'activities': ['Beauty', 'HairSalon', 'WomenHair'],
-            'phones': ['+1-555-0101', '+1-555-0102'],
-        },
-        {
-            'name': 'Main Street Auto Repair',
-            'building_index': 1,
-            'activities': ['Auto', 'CarRepair'],
-            'phones': ['+1-555-0201'],
-        },
-        {
-            'name': 'Oak Avenue Supermarket',
-            'building_index': 1,
-            'activities': ['Retail', 'Supermarket'],
-            'phones': ['+1-555-0301', '+1-555-0302', '+1-555-0303'],
-        },
-        {
-            'name': 'Pine Legal Associates',
-            'building_index': 2,
-            'activities': ['Legal', 'LawFirm'],
-            'phones': ['+1-555-0401', '+1-555-0402'],
-        },
-        {
-            'name': 'Elm Italian Restaurant',
-            'building_index': 3,
-            'activities': ['Food', 'Restaurant'],
-            'phones': ['+1-555-0501'],
-        },
-        {
-            'name': 'Maple Electronics Store',
-            'building_index': 4,
-            'activities': ['Retail', 'Electronics'],
-            'phones': ['+1-555-0601', '+1-555-0602'],
-        },
-        {
-            'name': 'University Medical Center',
-            'building_index': 5,
-            'activities': ['Healthcare', 'Hospital'],
-            'phones': ['+1-555-0701', '+1-555-0702', '+1-555-0703'],
-        },
-        {
-            'name': 'Spruce Tech Solutions',
-            'building_index': 7,
-            'activities': ['IT', 'Software'],
-            'phones': ['+1-555-0801'],
-        },
-        {
-            'name': 'Willow Street Cafe',
-            'building_index': 8,
-            'activities': ['Food', 'Cafe'],
-            'phones': ['+1-555-0901', '+1-555-0902'],
-        },
-        {
-            'name': 'Ash Pharmacy',
-            'building_index': 9,
-            'activities': ['Healthcare', 'Pharmacy'],
-            'phones': ['+1-555-1001'],
-        },
-        # Organizations using deeply nested activities
-        {
-            'name': 'Elite Barber Shop',
-            'building_index': 0,
-            'activities': ['Services', 'Beauty', 'HairSalon', 'BarberShop'],
-            'phones': ['+1-555-1101'],
-        },
-        {
-            'name': 'Quick Car Wash',
-            'building_index': 1,
-            'activities': ['Services', 'Auto', 'CarWash'],
-            'phones': ['+1-555-1201', '+1-555-1202'],
-        },
-        {
-            'name': 'Luxury Nail Salon',
-            'building_index': 4,
-            'activities': ['Services', 'Beauty', 'NailSalon'],
-            'phones': ['+1-555-1301'],
-        },
-        {
-            'name': 'City Dental Clinic',
-            'building_index': 6,
-            'activities': ['Healthcare', 'Dentist'],
-            'phones': ['+1-555-1401', '+1-555-1402'],
-        },
-        {
-            'name': 'Central Notary Office',
-            'building_index': 2,
-            'activities': ['Services', 'Legal', 'Notary'],
-            'phones': ['+1-555-1501'],
-        },
-        {
-            'name': 'Tech Hardware Support',
-            'building_index': 7,
-            'activities': ['Services', 'IT', 'Hardware'],
-            'phones': ['+1-555-1601'],
-        },
-        {
-            'name': 'Wellness Spa Center',
-            'building_index': 3,
-            'activities': ['Services', 'Beauty', 'Spa'],
-            'phones': ['+1-555-1701', '+1-555-1702', '+1-555-1703'],
-        },
-        {
-            'name': 'Fashion Clothing Store',
-            'building_index': 4,
-            'activities': ['Retail', 'Clothing'],
-            'phones': ['+1-555-1801'],
-        },
-        {
-            'name': 'Fast Burger Joint',
-            'building_index': 8,
-            'activities': ['Food', 'FastFood'],
-            'phones': ['+1-555-1901'],
-        },
-        {
-            'name': 'Community School',
-            'building_index': 5,
-            'activities': ['Education', 'School'],
-            'phones': ['+1-555-2001', '+1-555-2002'],
-        },
-    ]
 
-    organizations = []
-    for data in organizations_data:
-        organization = Organization(
-            name=data['name'],
-            building_id=buildings[data['building_index']].id,
+        timed(
+            'Buildings',
+            lambda: copy_rows(
+                cursor,
+                'buildings',
+                ['id', 'address', 'geolocation'],
+                generate_buildings(options),
+            ),
         )
 
-        # Add activities (some use deeply nested activities)
-        org_activities = [activities[key] for key in data['activities']]
-        organization.activities = org_activities
+        activity_ids = [activity_id for level in levels for activity_id, _, _ in level]
+        organizations, phones, activities = generate_organizations(options, activity_ids)
+        timed(
+            'Organizations',
+            lambda: copy_rows(
+                cursor,
+                'organizations',
+                ['id', 'name', 'building_id'],
+                organizations,
+            ),
+        )
+        timed(
+            'Phones',
+            lambda: copy_rows(
+                cursor,
+                'organization_phones',
+                ['organization_id', 'phone_number'],
+                phones,
+            ),
+        )
+        timed(
+            'Organization activities',
+            lambda: copy_rows(
+                cursor,
+                'organization_activity',
+                ['organization_id', 'activity_id'],
+                activities,
+            ),
+        )
 
-        # Add phone numbers
-        organization.phones = [OrganizationPhone(phone_number=phone) for phone in data['phones']]
+        # Явные id не двигают последовательности
+        for table in ('activities', 'buildings', 'organizations'):
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "  # noqa: S608
+                f'(SELECT COALESCE(MAX(id), 0) + 1 FROM {table}), false)',
+            )
 
-        organizations.append(organization)
-        session.add(organization)
+        connection.commit()
 
-    session.commit()
-    # Refresh all organizations to ensure they're up to date
-    for organization in organizations:
-        session.refresh(organization)
-    return organizations
+        print('Analyzing tables...')
+        cursor.execute('ANALYZE activities, activity_closure, buildings, organizations')
+        cursor.execute('ANALYZE organization_phones, organization_activity')
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def parse_args() -> tuple[Options, bool]:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--buildings', type=int, default=1_000)
+    parser.add_argument('--organizations', type=int, default=10_000)
+    parser.add_argument(
+        '--fanout',
+        default='5,4,3',
+        help='Number of children per node on each of the 3 activity levels',
+    )
+    parser.add_argument('--area', choices=sorted(AREAS), default='city')
+    parser.add_argument('--max-phones', type=int, default=3)
+    parser.add_argument('--max-activities', type=int, default=3)
+    parser.add_argument('--yes', action='store_true', help='Clear existing data without asking')
+    args = parser.parse_args()
+
+    fanout = tuple(int(value) for value in args.fanout.split(','))
+    if len(fanout) != 3:  # noqa: PLR2004
+        parser.error('--fanout must list exactly 3 levels')
+
+    options = Options(
+        seed=args.seed,
+        buildings=args.buildings,
+        organizations=args.organizations,
+        fanout=fanout,
+        area=AREAS[args.area],
+        max_phones=args.max_phones,
+        max_activities=args.max_activities,
+    )
+    return options, args.yes
 
 
 def main():
     """Main function to populate the database."""
-    print('Starting database population...')
+    options, clear = parse_args()
+    print(f'Starting database population with {options}...')
 
-    # Get a session
-    session_gen = get_session()
-    session: Session = next(session_gen)
-
-    try:
-        # Check if data already exists
-        existing_activities = session.query(Activity).count()
-        existing_buildings = session.query(Building).count()
-        existing_organizations = session.query(Organization).count()
-
-        if existing_activities > 0 or existing_buildings > 0 or existing_organizations > 0:
-            response = input(
-                'Database already contains data. '
-                'Do you want to clear it and start fresh? (yes/no): ',
-            )
-            if response.lower() == 'yes':
-                print('Clearing existing data...')
-                session.query(OrganizationPhone).delete()
-                session.query(Organization).delete()
-                session.query(Building).delete()
-                session.query(Activity).delete()
-                session.commit()
-                print('Existing data cleared.')
-            else:
-                print('Keeping existing data. Exiting.')
-                return
-
-        print('Creating activities...')
-        activities = create_activities(session)
-        print(f'Created {len(activities)} activities')
-
-        print('Creating buildings...')
-        buildings = create_buildings(session)
-        print(f'Created {len(buildings)} buildings')
-
-        print('Creating organizations...')
-        organizations = create_organizations(session, activities, buildings)
-        print(f'Created {len(organizations)} organizations')
-
-        print('Database population completed successfully!')
-        print('\nSummary:')
-        print(f'  - Activities: {len(activities)} (with nested hierarchies)')
-        print(f'  - Buildings: {len(buildings)} (in different areas)')
-        print(f'  - Organizations: {len(organizations)} (with various activities)')
-
-    except Exception as e:
-        session.rollback()
-        print(f'Error populating database: {e}')
-        raise
-    finally:
-        session.close()
+    started = time.perf_counter()
+    populate(options, clear=clear)
+    print(f'Database population completed in {time.perf_counter() - started:.1f}s')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,189 @@
+"""Opt-in diagnostics: slow query log and per-request profiler.
+
+Both are configured from the environment and install nothing when disabled,
+so a default deployment pays no overhead for them.
+"""
+
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Запросы дольше порога в миллисекундах пишутся в лог, 0 - лог выключен
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', '0'))
+# Для медленных SELECT дополнительно логировать EXPLAIN (ANALYZE, BUFFERS)
+SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', 'false').lower() in {'1', 'true', 'yes'}
+# Профилирование запросов с заголовком X-Profile: 1
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() in {'1', 'true', 'yes'}
+PROFILE_HEADER = b'x-profile'
+PROFILE_STATS_LIMIT = 40
+
+
+class SlowQueryLog:
+    """Log statements slower than SLOW_QUERY_MS executed through an engine.
+
+    EXPLAIN runs in the background on a separate read-only connection and
+    re-executes the statement, so it is limited to SELECTs and to one plan at a
+    time; slow queries arriving meanwhile are logged without a plan.
+    """
+
+    def __init__(self, engine: AsyncEngine, threshold_ms: float, explain: bool) -> None:
+        self.engine = engine
+        self.threshold = threshold_ms / 1000
+        self.explain = explain
+        self._explaining: asyncio.Task | None = None
+
+    def install(self) -> None:
+        event.listen(self.engine.sync_engine, 'before_cursor_execute', self._before_execute)
+        event.listen(self.engine.sync_engine, 'after_cursor_execute', self._after_execute)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info['slow_query_started'] = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info.pop('slow_query_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed < self.threshold or statement.lstrip().upper().startswith('EXPLAIN'):
+            return
+
+        logger.warning(
+            'Slow query (%.1f ms): %s\nParameters: %r',
+            elapsed * 1000,
+            statement,
+            parameters,
+        )
+        if self.explain and not executemany and self._is_select(statement):
+            self._schedule_explain(statement, parameters)
+
+    @staticmethod
+    def _is_select(statement: str) -> bool:
+        return statement.lstrip().upper().startswith(('SELECT', 'WITH'))
+
+    def _schedule_explain(self, statement: str, parameters) -> None:
+        if self._explaining is not None and not self._explaining.done():
+            return
+        self._explaining = asyncio.get_running_loop().create_task(
+            self._log_plan(statement, parameters),
+        )
+
+    async def _log_plan(self, statement: str, parameters) -> None:
+        try:
+            async with self.engine.execution_options(postgresql_readonly=True).connect() as conn:
+                result = await conn.exec_driver_sql(
+                    f'EXPLAIN (ANALYZE, BUFFERS) {statement}',
+                    parameters,
+                )
+                plan = '\n'.join(row[0] for row in result)
+        except Exception:
+            logger.warning('Could not explain slow query', exc_info=True)
+            return
+        logger.warning('Plan of slow query: %s\n%s', statement, plan)
+
+
+def install_slow_query_log(engine: AsyncEngine) -> None:
+    SlowQueryLog(engine, SLOW_QUERY_MS, SLOW_QUERY_EXPLAIN).install()
+
+
+class _Profiler:
+    """pyinstrument when it is installed (the "profiling" extra), cProfile otherwise."""
+
+    def __init__(self) -> None:
+        try:
+            from pyinstrument import Profiler  # noqa: PLC0415
+        except ImportError:
+            self._pyinstrument = None
+            self._cprofile = cProfile.Profile()
+        else:
+            self._pyinstrument = Profiler(async_mode='enabled')
+
+    def start(self) -> None:
+        if self._pyinstrument is not None:
+            self._pyinstrument.start()
+        else:
+            self._cprofile.enable()
+
+    def stop(self) -> str:
+        if self._pyinstrument is not None:
+            self._pyinstrument.stop()
+            return self._pyinstrument.output_text(unicode=True, color=False)
+
+        self._cprofile.disable()
+        output = io.StringIO()
+        stats = pstats.Stats(self._cprofile, stream=output)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_STATS_LIMIT)
+        return output.getvalue()
+
+
+async def _send_text(send, status: int, body: bytes, headers: tuple = ()) -> None:
+    await send(
+        {
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'text/plain; charset=utf-8'),
+                (b'content-length', str(len(body)).encode()),
+                *headers,
+            ],
+        },
+    )
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class ProfilerMiddleware:
+    """Profile requests sent with `X-Profile: 1` and respond with the profile.
+
+    The original response is discarded; its status is kept in the
+    X-Profiled-Status header. cProfile traces everything the event loop runs
+    meanwhile, so profile under low concurrency. Only one request is profiled
+    at a time, others sent with the header get 409.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+        # В одном потоке может работать только один профилировщик
+        self._lock = asyncio.Lock()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http' or dict(scope['headers']).get(PROFILE_HEADER) != b'1':
+            await self.app(scope, receive, send)
+            return
+
+        if self._lock.locked():
+            await _send_text(send, 409, b'Another request is being profiled\n')
+            return
+
+        status = 500
+
+        async def discard(message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        async with self._lock:
+            profiler = _Profiler()
+            started = time.perf_counter()
+            try:
+                profiler.start()
+            except (RuntimeError, ValueError):
+                # Профилировщик уже запущен кем-то кроме этого middleware
+                await _send_text(send, 409, b'Another profiler is already active\n')
+                return
+
+            try:
+                await self.app(scope, receive, discard)
+            finally:
+                report = profiler.stop()
+            elapsed = time.perf_counter() - started
+
+        body = f'{scope["method"]} {scope["path"]} in {elapsed * 1000:.1f} ms\n\n{report}'.encode()
+        await _send_text(send, 200, body, ((b'x-profiled-status', str(status).encode()),))
@@ -0,0 +1,60 @@
+from collections.abc import Awaitable, Callable
+from typing import Annotated, Any
+
+from cache import ORGANIZATIONS_NAMESPACE, cached_json, etag_response, response_cache
+from db import ReadSessionDep
+from fastapi import APIRouter, Query, Request, Response
+from schemas import ActivityOut
+from services import activity_service
+from services.activity_service import activity_tree_cache
+from sqlalchemy.ext.asyncio import AsyncSession
+
+activity_router = APIRouter(prefix='/activities', tags=['activities'])
+
+CountsQuery = Annotated[
+    bool,
+    Query(description='Include organization counts (with descendants) for every node'),
+]
+
+
+async def _tree_response(
+    request: Request,
+    session: AsyncSession,
+    load: Callable[[], Awaitable[Any]],
+    **params: Any,
+) -> Response:
+    # Версия дерева входит в ключ: кэш организаций не сбрасывается при изменении дерева
+    tree = await activity_tree_cache.get(session)
+    content = await cached_json(
+        ORGANIZATIONS_NAMESPACE,
+        response_cache.key('activities', version=tree.version, **params),
+        load,
+        session,
+    )
+    return etag_response(content, request)
+
+
+@activity_router.get('/', response_model=list[ActivityOut])
+async def get_activity_tree(request: Request, session: ReadSessionDep, counts: CountsQuery = True):
+    return await _tree_response(
+        request,
+        session,
+        lambda: activity_service.get_activity_tree(counts, session),
+        counts=counts,
+    )
+
+
+@activity_router.get('/{gid}', response_model=ActivityOut)
+async def get_activity_subtree(
+    gid: int,
+    request: Request,
+    session: ReadSessionDep,
+    counts: CountsQuery = True,
+):
+    return await _tree_response(
+        request,
+        session,
+        lambda: activity_service.get_activity_subtree(gid, counts, session),
+        gid=gid,
+        counts=counts,
+    )
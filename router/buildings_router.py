@@ -0,0 +1,69 @@
+from typing import Annotated
+
+from db import ReadSessionDep
+from fastapi import APIRouter, Query
+from schemas import BuildingListOut, Page
+from serialization import json_response
+from services import buildings_service
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, CursorQuery, LimitQuery
+
+buildings_router = APIRouter(prefix='/buildings', tags=['buildings'])
+
+EmbedQuery = Annotated[bool, Query(description='Include organizations of every building')]
+
+
+@buildings_router.get('/location', response_model=Page[BuildingListOut])
+async def get_buildings_by_geolocation(
+    min_lon: Annotated[float, Query(ge=-180, le=180)],
+    min_lat: Annotated[float, Query(ge=-90, le=90)],
+    max_lon: Annotated[float, Query(ge=-180, le=180)],
+    max_lat: Annotated[float, Query(ge=-90, le=90)],
+    session: ReadSessionDep,
+    embed: EmbedQuery = False,
+    cursor: CursorQuery = None,
+    limit: LimitQuery = DEFAULT_PAGE_SIZE,
+):
+    return json_response(
+        await buildings_service.get_buildings_by_geolocation(
+            min_lat=min_lat,
+            min_lon=min_lon,
+            max_lat=max_lat,
+            max_lon=max_lon,
+            embed=embed,
+            cursor=cursor,
+            limit=limit,
+            session=session,
+        ),
+    )
+
+
+@buildings_router.get('/nearby', response_model=Page[BuildingListOut])
+async def get_buildings_nearby(
+    lat: Annotated[float, Query(ge=-90, le=90)],
+    lon: Annotated[float, Query(ge=-180, le=180)],
+    session: ReadSessionDep,
+    radius_m: Annotated[float | None, Query(gt=0)] = None,
+    k: Annotated[int | None, Query(ge=1, le=MAX_PAGE_SIZE)] = None,
+    embed: EmbedQuery = False,
+    cursor: CursorQuery = None,
+    limit: LimitQuery = DEFAULT_PAGE_SIZE,
+):
+    return json_response(
+        await buildings_service.get_buildings_nearby(
+            lat=lat,
+            lon=lon,
+            radius_m=radius_m,
+            k=k,
+            embed=embed,
+            cursor=cursor,
+            limit=limit,
+            session=session,
+        ),
+    )
+
+
+@buildings_router.get('/{gid}', response_model=BuildingListOut)
+async def get_building_by_id(gid: int, session: ReadSessionDep, embed: EmbedQuery = True):
+    return json_response(
+        await buildings_service.get_building_by_id(gid, embed, session),
+    )
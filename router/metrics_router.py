@@ -0,0 +1,87 @@
+from cache import response_cache
+from db import async_engine, replica_router
+from fastapi import APIRouter, Response
+from metrics import CONTENT_TYPE, Counter, Gauge, registry
+
+metrics_router = APIRouter(prefix='/metrics', tags=['metrics'])
+
+POOL_STATES = ('checked_out', 'checked_in', 'overflow', 'waiting')
+
+
+def _pool_stats() -> dict[str, dict[str, float]]:
+    stats = {'primary': async_engine.pool.stats()}
+    for index, engine in enumerate(replica_router.engines):
+        stats[f'replica{index}'] = engine.pool.stats()
+    return stats
+
+
+def _pool_field(field: str):
+    def collect() -> dict[tuple, float]:
+        return {(('engine', engine),): stats[field] for engine, stats in _pool_stats().items()}
+
+    return collect
+
+
+def _pool_connections() -> dict[tuple, float]:
+    return {
+        (('engine', engine), ('state', state)): stats[state]
+        for engine, stats in _pool_stats().items()
+        for state in POOL_STATES
+    }
+
+
+def _cache_requests() -> dict[tuple, float]:
+    stats = response_cache.stats()
+    return {(('result', 'hit'),): stats['hits'], (('result', 'miss'),): stats['misses']}
+
+
+registry.register(
+    Gauge('db_pool_size', 'Configured size of the connection pool', _pool_field('size')),
+)
+registry.register(
+    Gauge('db_pool_connections', 'Pool connections by state', _pool_connections),
+)
+registry.register(
+    Counter(
+        'db_pool_checkouts_total',
+        'Connections handed out by the pool',
+        _pool_field('checkouts'),
+    ),
+)
+registry.register(
+    Counter(
+        'db_pool_waits_total',
+        'Checkouts that found the pool exhausted and had to wait',
+        _pool_field('waits'),
+    ),
+)
+registry.register(
+    Counter(
+        'db_pool_wait_seconds_total',
+        'Time checkouts spent blocked on an exhausted pool',
+        _pool_field('wait_seconds_total'),
+    ),
+)
+registry.register(
+    Counter('cache_requests_total', 'Response cache lookups by result', _cache_requests),
+)
+registry.register(
+    Counter(
+        'cache_invalidations_total',
+        'Response cache namespace invalidations',
+        lambda: {(): response_cache.stats()['invalidations']},
+    ),
+)
+
+
+@metrics_router.get('', response_class=Response, responses={200: {'content': {CONTENT_TYPE: {}}}})
+async def get_metrics():
+    return Response(content=registry.render(), media_type=CONTENT_TYPE)
+
+
+@metrics_router.get('/pool')
+async def get_pool_metrics():
+    return {
+        'primary': async_engine.pool.stats(),
+        'replicas': [engine.pool.stats() for engine in replica_router.engines],
+    }
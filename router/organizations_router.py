@@ -1,48 +1,273 @@
-from db import SessionDep
-from fastapi import APIRouter
-from schemas import OrganizationCreate, OrganizationOut
-from services import organizations_service
+from typing import Annotated
+
+from cache import ORGANIZATIONS_NAMESPACE, cached_json_response, response_cache
+from db import READ_PRIMARY_INFO, ReadSessionDep, WriteSessionDep
+from fastapi import APIRouter, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from schemas import (
+    MAX_BATCH_SIZE,
+    BulkImportResult,
+    ExportFormat,
+    NameSearchMode,
+    OrganizationBatchIn,
+    OrganizationBatchOut,
+    OrganizationCreate,
+    OrganizationFilter,
+    OrganizationMatchOut,
+    OrganizationNearbyOut,
+    OrganizationOut,
+    Page,
+)
+from serialization import json_response
+from services import import_service, organizations_service
+from services.import_service import iter_lines
+from services.organizations_service import DEFAULT_SIMILARITY_THRESHOLD
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, CursorQuery, LimitQuery
 
 organizations_router = APIRouter(prefix='/organizations', tags=['organizations'])
 
 
-@organizations_router.get('/name', response_model=list[OrganizationOut])
-async def get_organization_by_name(q: str, session: SessionDep):
-    return organizations_service.get_organizations_by_name(q, session)
+@organizations_router.get('/name', response_model=Page[OrganizationMatchOut])
+async def get_organization_by_name(
+    q: Annotated[str, Query(min_length=1)],
+    session: ReadSessionDep,
+    mode: NameSearchMode = NameSearchMode.FUZZY,
+    threshold: Annotated[float, Query(gt=0, le=1)] = DEFAULT_SIMILARITY_THRESHOLD,
+    cursor: CursorQuery = None,
+    limit: LimitQuery = DEFAULT_PAGE_SIZE,
+):
+    return json_response(
+        await organizations_service.get_organizations_by_name(
+            name=q,
+            mode=mode,
+            threshold=threshold,
+            cursor=cursor,
+            limit=limit,
+            session=session,
+        ),
+    )
 
 
-@organizations_router.get('/building', response_model=list[OrganizationOut])
-async def get_organizations_by_building(q: int, session: SessionDep):
-    return organizations_service.get_organizations_by_building(q, session)
+@organizations_router.get('/search', response_model=Page[OrganizationMatchOut])
+async def search_organizations(
+    q: Annotated[str, Query(min_length=1)],
+    session: ReadSessionDep,
+    threshold: Annotated[float, Query(gt=0, le=1)] = DEFAULT_SIMILARITY_THRESHOLD,
+    cursor: CursorQuery = None,
+    limit: LimitQuery = DEFAULT_PAGE_SIZE,
+):
+    return json_response(
+        await organizations_service.search_organizations(
+            q=q,
+            threshold=threshold,
+            cursor=cursor,
+            limit=limit,
+            session=session,
+        ),
+    )
 
 
-@organizations_router.get('/activity', response_model=list[OrganizationOut])
-async def get_organizations_by_activity(q: int, session: SessionDep):
-    return organizations_service.get_organizations_by_activity(q, session)
+@organizations_router.get('/query', response_model=Page[OrganizationOut])
+async def query_organizations(
+    session: ReadSessionDep,
+    activity: int | None = None,
+    building: int | None = None,
+    min_lon: Annotated[float | None, Query(ge=-180, le=180)] = None,
+    min_lat: Annotated[float | None, Query(ge=-90, le=90)] = None,
+    max_lon: Annotated[float | None, Query(ge=-180, le=180)] = None,
+    max_lat: Annotated[float | None, Query(ge=-90, le=90)] = None,
+    lat: Annotated[float | None, Query(ge=-90, le=90)] = None,
+    lon: Annotated[float | None, Query(ge=-180, le=180)] = None,
+    radius_m: Annotated[float | None, Query(gt=0)] = None,
+    name: Annotated[str | None, Query(min_length=1)] = None,
+    threshold: Annotated[float, Query(gt=0, le=1)] = DEFAULT_SIMILARITY_THRESHOLD,
+    cursor: CursorQuery = None,
+    limit: LimitQuery = DEFAULT_PAGE_SIZE,
+):
+    filters = OrganizationFilter(
+        activity=activity,
+        building=building,
+        min_lon=min_lon,
+        min_lat=min_lat,
+        max_lon=max_lon,
+        max_lat=max_lat,
+        lat=lat,
+        lon=lon,
+        radius_m=radius_m,
+        name=name,
+        threshold=threshold,
+    )
+    return json_response(
+        await organizations_service.query_organizations(filters, cursor, limit, session),
+    )
+
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: 'application/x-ndjson',
+    ExportFormat.CSV: 'text/csv',
+}
+
+
+@organizations_router.get(
+    '/export',
+    response_class=StreamingResponse,
+    responses={200: {'content': {media_type: {} for media_type in EXPORT_MEDIA_TYPES.values()}}},
+)
+async def export_organizations(
+    session: ReadSessionDep,
+    format: ExportFormat = ExportFormat.NDJSON,  # noqa: A002
+    activity: int | None = None,
+    min_lon: Annotated[float | None, Query(ge=-180, le=180)] = None,
+    min_lat: Annotated[float | None, Query(ge=-90, le=90)] = None,
+    max_lon: Annotated[float | None, Query(ge=-180, le=180)] = None,
+    max_lat: Annotated[float | None, Query(ge=-90, le=90)] = None,
+):
+    # Фильтры проверяются до начала ответа, чтобы ошибка пришла с кодом 4xx
+    conditions = await organizations_service.organization_conditions(
+        OrganizationFilter(
+            activity=activity,
+            min_lon=min_lon,
+            min_lat=min_lat,
+            max_lon=max_lon,
+            max_lat=max_lat,
+        ),
+        session,
+    )
+    return StreamingResponse(
+        organizations_service.export_organizations(
+            format,
+            conditions,
+            read_primary=session.info.get(READ_PRIMARY_INFO, False),
+        ),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={'Content-Disposition': f'attachment; filename="organizations.{format}"'},
+    )
 
 
-@organizations_router.get('/location', response_model=list[OrganizationOut])
+@organizations_router.get('/building', response_model=Page[OrganizationOut])
+async def get_organizations_by_building(
+    q: int,
+    session: ReadSessionDep,
+    cursor: CursorQuery = None,
+    limit: LimitQuery = DEFAULT_PAGE_SIZE,
+):
+    return await cached_json_response(
+        ORGANIZATIONS_NAMESPACE,
+        response_cache.key('building', q=q, cursor=cursor, limit=limit),
+        lambda: organizations_service.get_organizations_by_building(q, cursor, limit, session),
+        session,
+    )
+
+
+@organizations_router.get('/activity', response_model=Page[OrganizationOut])
+async def get_organizations_by_activity(
+    q: int,
+    session: ReadSessionDep,
+    cursor: CursorQuery = None,
+    limit: LimitQuery = DEFAULT_PAGE_SIZE,
+):
+    content = await organizations_service.get_organizations_by_activity_json(
+        q,
+        cursor,
+        limit,
+        session,
+    )
+    return Response(content=content, media_type='application/json')
+
+
+@organizations_router.get('/location', response_model=Page[OrganizationOut])
 async def get_organizations_by_geolocation(
     min_lon: float,
     min_lat: float,
     max_lon: float,
     max_lat: float,
-    session: SessionDep,
+    session: ReadSessionDep,
+    cursor: CursorQuery = None,
+    limit: LimitQuery = DEFAULT_PAGE_SIZE,
 ):
-    return organizations_service.get_organizations_by_geolocation(
+    content = await organizations_service.get_organizations_by_geolocation_json(
         min_lat=min_lat,
         min_lon=min_lon,
         max_lat=max_lat,
         max_lon=max_lon,
+        cursor=cursor,
+        limit=limit,
         session=session,
     )
+    return Response(content=content, media_type='application/json')
+
+
+@organizations_router.get('/nearby', response_model=Page[OrganizationNearbyOut])
+async def get_organizations_nearby(
+    lat: Annotated[float, Query(ge=-90, le=90)],
+    lon: Annotated[float, Query(ge=-180, le=180)],
+    session: ReadSessionDep,
+    radius_m: Annotated[float | None, Query(gt=0)] = None,
+    k: Annotated[int | None, Query(ge=1, le=MAX_PAGE_SIZE)] = None,
+    cursor: CursorQuery = None,
+    limit: LimitQuery = DEFAULT_PAGE_SIZE,
+):
+    return json_response(
+        await organizations_service.get_organizations_nearby(
+            lat=lat,
+            lon=lon,
+            radius_m=radius_m,
+            k=k,
+            cursor=cursor,
+            limit=limit,
+            session=session,
+        ),
+    )
 
 
+@organizations_router.post(
+    '/bulk',
+    response_model=BulkImportResult,
+    openapi_extra={
+        'requestBody': {
+            'required': True,
+            'content': {
+                'application/x-ndjson': {
+                    'schema': {'$ref': '#/components/schemas/OrganizationCreate'},
+                },
+            },
+        },
+    },
+)
+async def import_organizations(request: Request, session: WriteSessionDep):
+    return await import_service.import_organizations(iter_lines(request.stream()), session)
+
+
+# Ответ записи собирает FastAPI: cookie read_primary из зависимости попадает
+# в ответ, только если обработчик не возвращает свой Response
 @organizations_router.post('/', response_model=OrganizationOut)
-async def create_organization(organization: OrganizationCreate, session: SessionDep):
-    return organizations_service.create_organization(organization, session)
+async def create_organization(organization: OrganizationCreate, session: WriteSessionDep):
+    return await organizations_service.create_organization(organization, session)
+
+
+@organizations_router.get('/batch', response_model=OrganizationBatchOut)
+async def get_organizations_by_ids(
+    ids: Annotated[list[int], Query(min_length=1, max_length=MAX_BATCH_SIZE)],
+    session: ReadSessionDep,
+):
+    return json_response(
+        await organizations_service.get_organizations_by_ids(ids, session),
+    )
+
+
+# POST для списков id, которые не помещаются в URL
+@organizations_router.post('/batch', response_model=OrganizationBatchOut)
+async def post_organizations_by_ids(batch: OrganizationBatchIn, session: ReadSessionDep):
+    return json_response(
+        await organizations_service.get_organizations_by_ids(batch.ids, session),
+    )
 
 
 @organizations_router.get('/{gid}', response_model=OrganizationOut)
-async def get_organization_by_id(gid: int, session: SessionDep):
-    return organizations_service.get_organization_by_id(gid, session)
+async def get_organization_by_id(gid: int, session: ReadSessionDep):
+    return await cached_json_response(
+        ORGANIZATIONS_NAMESPACE,
+        response_cache.key('id', gid=gid),
+        lambda: organizations_service.get_organization_by_id(gid, session),
+        session,
+    )
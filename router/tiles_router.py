@@ -0,0 +1,23 @@
+from cache import TILES_NAMESPACE, etag_response, response_cache
+from db import ReadSessionDep
+from fastapi import APIRouter, Request, Response
+from services import tiles_service
+
+tiles_router = APIRouter(prefix='/tiles', tags=['tiles'])
+
+MVT_MEDIA_TYPE = 'application/vnd.mapbox-vector-tile'
+
+
+@tiles_router.get(
+    '/{z}/{x}/{y}',
+    response_class=Response,
+    responses={200: {'content': {MVT_MEDIA_TYPE: {}}}},
+)
+async def get_tile(z: int, x: int, y: int, request: Request, session: ReadSessionDep):
+    content = await response_cache.get_or_set(
+        TILES_NAMESPACE,
+        response_cache.key('tile', z=z, x=x, y=y),
+        lambda: tiles_service.get_tile(z, x, y, session),
+        session,
+    )
+    return etag_response(content, request, media_type=MVT_MEDIA_TYPE)
@@ -1,8 +1,9 @@
+from enum import StrEnum
 from typing import Annotated, Any
 
 from geoalchemy2 import WKBElement
 from geoalchemy2.shape import to_shape
-from pydantic import BaseModel, BeforeValidator, ConfigDict
+from pydantic import AfterValidator, AliasChoices, BaseModel, BeforeValidator, ConfigDict, Field
 from shapely.geometry.base import BaseGeometry
 
 
@@ -23,6 +24,16 @@ def validate_phones(value: Any):
     return [stringify_phone(value)]
 
 
+def reject_nul(value: str) -> str:
+    # PostgreSQL не хранит символ NUL в текстовых полях
+    if '\x00' in value:
+        raise ValueError('NUL characters are not allowed')
+    return value
+
+
+TextField = Annotated[str, AfterValidator(reject_nul)]
+
+
 def wkb_to_shape(wkb: WKBElement | BaseGeometry) -> BaseGeometry | None:
     if isinstance(wkb, WKBElement):
         return to_shape(wkb)
@@ -36,17 +47,26 @@ def dump_geom(value: Any) -> dict:
     return getattr(wkb_to_shape(value), '__geo_interface__', None)
 
 
+# Building.geo_point собирается из уже загруженных координат, WKB разбирается
+# только если передана сама геометрия
+GeolocationField = Annotated[
+    dict,
+    BeforeValidator(dump_geom),
+    Field(validation_alias=AliasChoices('geo_point', 'geolocation')),
+]
+
+
 class OrganizationCreate(BaseModel):
-    name: str
+    name: TextField
     building_id: int
-    phones: list[str]
+    phones: list[TextField]
     activities: list[int]
 
 
 class OrganizationUpdate(BaseModel):
-    name: str | None = None
+    name: TextField | None = None
     building_id: int | None = None
-    phones: list[str] | None = None
+    phones: list[TextField] | None = None
     activities: list[int] | None = None
 
 
@@ -55,7 +75,7 @@ class BuildingOutNested(BaseModel):
 
     id: int
     address: str
-    geolocation: Annotated[dict, BeforeValidator(dump_geom)]
+    geolocation: GeolocationField
 
 
 class ActivityOutNested(BaseModel):
@@ -71,7 +91,7 @@ class OrganizationOutNested(BaseModel):
     id: int
     name: str
     phones: Annotated[list[str], BeforeValidator(validate_phones)]
-    activities: list['ActivityOut']
+    activities: list['ActivityOutNested']
 
 
 class ActivityOut(BaseModel):
@@ -79,6 +99,8 @@ class ActivityOut(BaseModel):
 
     id: int
     name: str
+    # Организации вида деятельности и всех его потомков
+    organization_count: int | None = None
     children: list['ActivityOut'] = []
 
 
@@ -87,10 +109,23 @@ class BulidingOut(BaseModel):
 
     id: int
     address: str
-    geolocation: Annotated[dict, BeforeValidator(dump_geom)]
+    geolocation: GeolocationField
     organizations: list['OrganizationOutNested'] = []
 
 
+class BuildingListOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    address: str
+    geolocation: GeolocationField
+    organization_count: int
+    # Расстояние до точки запроса в метрах, только для /buildings/nearby
+    distance: float | None = None
+    # Заполняется только при embed=true
+    organizations: list['OrganizationOutNested'] | None = None
+
+
 class OrganizationOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -99,3 +134,68 @@ class OrganizationOut(BaseModel):
     building: 'BuildingOutNested'
     phones: Annotated[list[str], BeforeValidator(validate_phones)]
     activities: list['ActivityOutNested']
+
+
+class NameSearchMode(StrEnum):
+    FUZZY = 'fuzzy'
+    WORD = 'word'
+    PREFIX = 'prefix'
+
+
+class ExportFormat(StrEnum):
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+
+
+class OrganizationMatchOut(BaseModel):
+    organization: OrganizationOut
+    score: float
+
+
+class OrganizationNearbyOut(BaseModel):
+    organization: OrganizationOut
+    distance: float
+
+
+# Ограничение числа id в одном пакетном запросе
+MAX_BATCH_SIZE = 500
+
+
+class OrganizationBatchIn(BaseModel):
+    ids: list[int] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class OrganizationBatchOut(BaseModel):
+    items: list[OrganizationOut]
+    missing: list[int]
+
+
+class OrganizationFilter(BaseModel):
+    """Any combination of filters for /organizations/query, applied with AND."""
+
+    activity: int | None = None
+    building: int | None = None
+    min_lon: float | None = None
+    min_lat: float | None = None
+    max_lon: float | None = None
+    max_lat: float | None = None
+    lat: float | None = None
+    lon: float | None = None
+    radius_m: float | None = None
+    name: str | None = None
+    threshold: float = 0.3
+
+
+class Page[ItemT](BaseModel):
+    items: list[ItemT]
+    next_cursor: str | None = None
+
+
+class BulkImportError(BaseModel):
+    line: int
+    detail: str
+
+
+class BulkImportResult(BaseModel):
+    created: int
+    errors: list[BulkImportError]
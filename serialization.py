@@ -0,0 +1,53 @@
+"""JSON encoding of responses that services have already shaped.
+
+Services turn ORM objects into plain dicts and lists matching the output
+schemas, and a response is encoded with pydantic_core.to_json as is: no
+validation and no schema serializer, so nothing filters or coerces the dicts.
+Builders must produce exactly the JSON of the validated schema;
+tests/test_serialization.py checks every builder against it.
+"""
+
+from typing import Any
+
+from fastapi import Response
+from metrics import measure_serialization
+from models import Activity, Building, Organization
+from pydantic_core import to_json
+from schemas import ActivityOutNested, BuildingOutNested, OrganizationOut, OrganizationOutNested
+
+
+def dump_json(data: Any) -> bytes:
+    """Encode dicts and lists shaped like a response schema, without validating them."""
+    with measure_serialization():
+        return to_json(data)
+
+
+def json_response(data: Any) -> Response:
+    return Response(content=dump_json(data), media_type='application/json')
+
+
+def building_nested_item(building: Building) -> BuildingOutNested:
+    return {'id': building.id, 'address': building.address, 'geolocation': building.geo_point}
+
+
+def activity_nested_item(activity: Activity) -> ActivityOutNested:
+    return {'id': activity.id, 'name': activity.name}
+
+
+def organization_nested_item(organization: Organization) -> OrganizationOutNested:
+    return {
+        'id': organization.id,
+        'name': organization.name,
+        'phones': [phone.phone_number for phone in organization.phones],
+        'activities': [activity_nested_item(activity) for activity in organization.activities],
+    }
+
+
+def organization_item(organization: Organization) -> OrganizationOut:
+    return {
+        'id': organization.id,
+        'name': organization.name,
+        'building': building_nested_item(organization.building),
+        'phones': [phone.phone_number for phone in organization.phones],
+        'activities': [activity_nested_item(activity) for activity in organization.activities],
+    }
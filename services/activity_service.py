@@ -0,0 +1,264 @@
+import asyncio
+import contextlib
+import logging
+from dataclasses import dataclass
+
+import asyncpg
+from db import async_engine, async_session_factory
+from fastapi import HTTPException
+from models import Activity, activity_closure, activity_tree_version, organization_activity
+from schemas import ActivityOut
+from sqlalchemy import ARRAY, Integer, any_, distinct, func, literal, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_TREE_CHANNEL = 'activity_tree'
+# Пауза между попытками переподключить слушателя растёт от первой до второй границы
+LISTENER_RETRY_DELAYS = (1.0, 60.0)
+
+
+@dataclass(frozen=True)
+class ActivityTree:
+    """Immutable snapshot of the whole activity hierarchy."""
+
+    version: int
+    names: dict[int, str]
+    parents: dict[int, int | None]
+    children: dict[int, tuple[int, ...]]
+    descendants: dict[int, frozenset[int]]
+
+    @classmethod
+    def build(cls, version: int, rows: list[tuple[int, int | None, str]]) -> 'ActivityTree':
+        names = {}
+        parents = {}
+        children = {}
+        for activity_id, parent_id, name in sorted(rows):
+            names[activity_id] = name
+            parents[activity_id] = parent_id
+            children.setdefault(activity_id, [])
+            if parent_id is not None:
+                children.setdefault(parent_id, []).append(activity_id)
+
+        # Множество потомков узла включает сам узел
+        descendants = {}
+
+        def collect(activity_id: int) -> frozenset[int]:
+            if activity_id not in descendants:
+                nested = {activity_id}
+                for child_id in children[activity_id]:
+                    nested |= collect(child_id)
+                descendants[activity_id] = frozenset(nested)
+            return descendants[activity_id]
+
+        for activity_id in names:
+            collect(activity_id)
+
+        return cls(
+            version=version,
+            names=names,
+            parents=parents,
+            children={key: tuple(value) for key, value in children.items()},
+            descendants=descendants,
+        )
+
+    @property
+    def roots(self) -> tuple[int, ...]:
+        return tuple(key for key, parent_id in self.parents.items() if parent_id is None)
+
+
+class ActivityTreeCache:
+    """In-process cache of the activity tree.
+
+    A trigger on `activities` bumps the counter in `activity_tree_version` and
+    sends the new version by NOTIFY on the `activity_tree` channel; the snapshot
+    is reloaded until it reaches the latest notified version. While the listener
+    connection is down, the counter is checked on every access instead, and the
+    connection is re-established in the background with exponential backoff.
+    Snapshots are always loaded from the primary, so a lagging replica cannot
+    bring an old tree back.
+    """
+
+    def __init__(self) -> None:
+        self._tree: ActivityTree | None = None
+        self._min_version = 0
+        self._listener: asyncpg.Connection | None = None
+        self._reconnect_task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def listening(self) -> bool:
+        return self._listener is not None and not self._listener.is_closed()
+
+    async def start(self) -> None:
+        try:
+            await self._listen()
+        except (OSError, asyncpg.PostgresError):
+            logger.exception('Activity tree listener is unavailable, falling back to polling')
+            self._schedule_reconnect()
+
+        await self._reload()
+
+    async def stop(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._reconnect_task
+            self._reconnect_task = None
+
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            await listener.close()
+
+    async def get(self, session: AsyncSession) -> ActivityTree:
+        tree = self._tree
+        if self._is_fresh(tree):
+            if self.listening:
+                return tree
+
+            # Сессия может смотреть на отстающую реплику: её версия бывает
+            # меньше версии снимка, и это не повод перечитывать дерево
+            current_version = await session.scalar(select(activity_tree_version.c.version))
+            self.require_version(current_version or 0)
+            if self._is_fresh(tree):
+                return tree
+
+        async with self._lock:
+            # Снимок мог обновить другой запрос, пока мы ждали блокировку
+            if self._tree is not tree and self._is_fresh(self._tree):
+                return self._tree
+            return await self._reload()
+
+    def require_version(self, version: int) -> None:
+        """Make snapshots older than the version stale."""
+        self._min_version = max(self._min_version, version)
+
+    def _is_fresh(self, tree: ActivityTree | None) -> bool:
+        return tree is not None and tree.version >= self._min_version
+
+    async def _reload(self) -> ActivityTree:
+        async with async_session_factory() as session:
+            return await self._load(session)
+
+    async def _load(self, session: AsyncSession) -> ActivityTree:
+        # Версия читается раньше дерева: при READ COMMITTED снимок может оказаться
+        # новее своей версии, но не старше, и лишь будет перечитан при следующей проверке
+        version = await session.scalar(select(activity_tree_version.c.version))
+        rows = (await session.execute(select(Activity.id, Activity.parent_id, Activity.name))).all()
+        self._tree = ActivityTree.build(version or 0, [tuple(row) for row in rows])
+        return self._tree
+
+    async def _listen(self) -> None:
+        dsn = async_engine.url.set(drivername='postgresql')
+        listener = await asyncpg.connect(dsn.render_as_string(hide_password=False))
+        try:
+            await listener.add_listener(ACTIVITY_TREE_CHANNEL, self._on_notify)
+            listener.add_termination_listener(self._on_terminate)
+            # NOTIFY, отправленные пока слушателя не было, потеряны: догоняем по счётчику
+            self.require_version(
+                await listener.fetchval('SELECT version FROM activity_tree_version') or 0,
+            )
+        except BaseException:
+            await listener.close()
+            raise
+        self._listener = listener
+
+    async def _reconnect(self) -> None:
+        delay, max_delay = LISTENER_RETRY_DELAYS
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                await self._listen()
+            except (OSError, asyncpg.PostgresError) as e:
+                delay = min(delay * 2, max_delay)
+                logger.warning(
+                    'Activity tree listener reconnect failed, retrying in %.0fs: %s',
+                    delay,
+                    e,
+                )
+            else:
+                logger.info('Activity tree listener reconnected')
+                return
+
+    def _schedule_reconnect(self) -> None:
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self.require_version(int(payload))
+
+    def _on_terminate(self, connection) -> None:
+        # Соединение, закрытое в stop(), уже отвязано от кэша
+        if connection is not self._listener:
+            return
+        logger.warning('Activity tree listener connection closed, falling back to polling')
+        self._listener = None
+        self._schedule_reconnect()
+
+
+activity_tree_cache = ActivityTreeCache()
+
+
+async def get_organization_counts(
+    session: AsyncSession,
+    activity_ids: frozenset[int] | None = None,
+) -> dict[int, int]:
+    """Number of organizations per activity, including its descendants.
+
+    One aggregate over the closure table; an organization linked to several
+    activities of the same subtree is counted once. With `activity_ids` only
+    those activities are counted.
+    """
+    query = (
+        select(
+            activity_closure.c.ancestor_id,
+            func.count(distinct(organization_activity.c.organization_id)),
+        )
+        .join(
+            organization_activity,
+            organization_activity.c.activity_id == activity_closure.c.descendant_id,
+        )
+        .group_by(activity_closure.c.ancestor_id)
+    )
+    if activity_ids is not None:
+        query = query.where(
+            activity_closure.c.ancestor_id == any_(literal(sorted(activity_ids), ARRAY(Integer))),
+        )
+    rows = await session.execute(query)
+    return dict(rows.tuples().all())
+
+
+def build_activity_nodes(
+    tree: ActivityTree,
+    activity_ids: tuple[int, ...],
+    counts: dict[int, int] | None,
+) -> list[ActivityOut]:
+    return [
+        {
+            'id': activity_id,
+            'name': tree.names[activity_id],
+            'organization_count': counts.get(activity_id, 0) if counts is not None else None,
+            'children': build_activity_nodes(tree, tree.children[activity_id], counts),
+        }
+        for activity_id in activity_ids
+    ]
+
+
+async def get_activity_tree(with_counts: bool, session: AsyncSession) -> list[ActivityOut]:
+    """Whole tree built from the cached snapshot."""
+    tree = await activity_tree_cache.get(session)
+    counts = await get_organization_counts(session) if with_counts else None
+    return build_activity_nodes(tree, tree.roots, counts)
+
+
+async def get_activity_subtree(
+    gid: int,
+    with_counts: bool,
+    session: AsyncSession,
+) -> ActivityOut:
+    tree = await activity_tree_cache.get(session)
+    if gid not in tree.names:
+        raise HTTPException(status_code=404, detail='Activity not found')
+
+    counts = await get_organization_counts(session, tree.descendants[gid]) if with_counts else None
+    return build_activity_nodes(tree, (gid,), counts)[0]
@@ -0,0 +1,185 @@
+from fastapi import HTTPException
+from geoalchemy2 import Geography
+from models import Building, Organization
+from schemas import BuildingListOut, Page
+from serialization import organization_nested_item
+from services.pagination import paginate
+from sqlalchemy import ColumnElement, Float, Row, Select, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+# Организации здания со всеми связями: по одному IN-запросу на уровень
+# для всей страницы зданий
+BUILDING_ORGANIZATIONS_LOAD_OPTIONS = (
+    selectinload(Building.organizations).options(
+        selectinload(Organization.phones),
+        selectinload(Organization.activities),
+    ),
+)
+
+
+def geography_point(lat: float, lon: float) -> ColumnElement:
+    return cast(
+        func.ST_SetSRID(func.ST_MakePoint(lon, lat), 4326),
+        Geography(geometry_type='POINT', srid=4326),
+    )
+
+
+def in_bounding_box(
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+) -> ColumnElement:
+    bounding_box = func.ST_MakeEnvelope(
+        min_lon,
+        min_lat,
+        max_lon,
+        max_lat,
+        4326,
+    )
+
+    return Building.geolocation.intersects(bounding_box)
+
+
+def in_radius(lat: float, lon: float, radius_m: float) -> ColumnElement:
+    return func.ST_DWithin(Building.geolocation, geography_point(lat, lon), radius_m)
+
+
+async def paginate_nearby(
+    query: Select,
+    tiebreaker: ColumnElement,
+    lat: float,
+    lon: float,
+    radius_m: float | None,
+    k: int | None,
+    cursor: str | None,
+    limit: int,
+    session: AsyncSession,
+) -> tuple[list[Row], str | None]:
+    """Page a query joined with buildings by distance from the point.
+
+    Either within radius_m, or the k nearest (a single page without a cursor).
+    Rows end with the distance in meters and the tiebreaker, as with paginate().
+    """
+    if radius_m is None and k is None:
+        raise HTTPException(status_code=422, detail='Either radius_m or k must be provided')
+
+    # Оператор KNN `<->` позволяет отсортировать по расстоянию через GiST индекс
+    distance = Building.geolocation.op('<->', return_type=Float)(geography_point(lat, lon))
+
+    if radius_m is not None:
+        query = query.where(in_radius(lat, lon, radius_m))
+
+    # В режиме k ближайших выдача ограничена k строками и не листается
+    if k is not None:
+        cursor, limit = None, k
+
+    rows, next_cursor = await paginate(
+        query,
+        order_by=[(distance, False), (tiebreaker, False)],
+        cursor=cursor,
+        limit=limit,
+        session=session,
+    )
+    return rows, next_cursor if k is None else None
+
+
+def organization_count() -> ColumnElement:
+    # Считается по индексу (building_id, id), сами организации не загружаются
+    return (
+        select(func.count())
+        .where(Organization.building_id == Building.id)
+        .correlate(Building)
+        .scalar_subquery()
+    )
+
+
+def _building_item(
+    building: Building,
+    organization_count: int,
+    embed: bool,
+    distance: float | None = None,
+) -> BuildingListOut:
+    return {
+        'id': building.id,
+        'address': building.address,
+        'geolocation': building.geo_point,
+        'organization_count': organization_count,
+        'distance': distance,
+        'organizations': (
+            [organization_nested_item(organization) for organization in building.organizations]
+            if embed
+            else None
+        ),
+    }
+
+
+def _building_query(embed: bool) -> Select:
+    query = select(Building).add_columns(organization_count())
+    if embed:
+        query = query.options(*BUILDING_ORGANIZATIONS_LOAD_OPTIONS)
+    return query
+
+
+async def get_building_by_id(gid: int, embed: bool, session: AsyncSession) -> BuildingListOut:
+    row = (await session.execute(_building_query(embed).where(Building.id == gid))).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail='Building not found')
+
+    building, organization_count = row
+    return _building_item(building, organization_count, embed)
+
+
+async def get_buildings_by_geolocation(
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+    embed: bool,
+    cursor: str | None,
+    limit: int,
+    session: AsyncSession,
+) -> Page[BuildingListOut]:
+    query = _building_query(embed).where(in_bounding_box(min_lat, min_lon, max_lat, max_lon))
+
+    rows, next_cursor = await paginate(
+        query,
+        order_by=[(Building.id, False)],
+        cursor=cursor,
+        limit=limit,
+        session=session,
+    )
+
+    return {
+        'items': [_building_item(row[0], row[1], embed) for row in rows],
+        'next_cursor': next_cursor,
+    }
+
+
+async def get_buildings_nearby(
+    lat: float,
+    lon: float,
+    radius_m: float | None,
+    k: int | None,
+    embed: bool,
+    cursor: str | None,
+    limit: int,
+    session: AsyncSession,
+) -> Page[BuildingListOut]:
+    rows, next_cursor = await paginate_nearby(
+        _building_query(embed),
+        Building.id,
+        lat=lat,
+        lon=lon,
+        radius_m=radius_m,
+        k=k,
+        cursor=cursor,
+        limit=limit,
+        session=session,
+    )
+
+    return {
+        'items': [_building_item(row[0], row[1], embed, distance=row[2]) for row in rows],
+        'next_cursor': next_cursor,
+    }
@@ -0,0 +1,186 @@
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+
+import asyncpg
+from cache import ORGANIZATIONS_NAMESPACE, TILES_NAMESPACE, response_cache
+from models import Building, Organization, OrganizationPhone, organization_activity
+from pydantic import ValidationError
+from schemas import BulkImportResult, OrganizationCreate
+from services.activity_service import activity_tree_cache
+from sqlalchemy import ARRAY, Integer, any_, insert, literal, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+BULK_BATCH_SIZE = 1000
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Split a stream of byte chunks into lines without buffering the whole body."""
+    tail = b''
+    async for chunk in chunks:
+        lines = (tail + chunk).split(b'\n')
+        tail = lines.pop()
+        for line in lines:
+            yield line
+    if tail:
+        yield tail
+
+
+async def import_organizations(
+    lines: AsyncIterable[bytes],
+    session: AsyncSession,
+    batch_size: int = BULK_BATCH_SIZE,
+) -> BulkImportResult:
+    """Import organizations from NDJSON lines.
+
+    Every batch is validated with set-based lookups and loaded with one
+    multi-row INSERT ... RETURNING plus COPY for phones and activities. If the
+    database rejects the batch, its rows are retried one by one in savepoints.
+    Invalid rows are reported by line number and never abort the rest of the
+    import.
+    """
+    result = {'created': 0, 'errors': []}
+    batch = []
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+
+        try:
+            batch.append((line_number, OrganizationCreate.model_validate_json(line)))
+        except ValidationError as e:
+            result['errors'].append({'line': line_number, 'detail': _format_error(e)})
+
+        if len(batch) >= batch_size:
+            await _import_batch(batch, session, result)
+            batch = []
+
+    if batch:
+        await _import_batch(batch, session, result)
+
+    if result['created']:
+        await response_cache.invalidate(ORGANIZATIONS_NAMESPACE, TILES_NAMESPACE)
+    return result
+
+
+async def _import_batch(
+    batch: list[tuple[int, OrganizationCreate]],
+    session: AsyncSession,
+    result: dict,
+) -> None:
+    building_ids = {organization.building_id for _, organization in batch}
+    existing_buildings = set(
+        (
+            await session.scalars(
+                select(Building.id).where(
+                    Building.id == any_(literal(sorted(building_ids), ARRAY(Integer))),
+                ),
+            )
+        ).all(),
+    )
+    tree = await activity_tree_cache.get(session)
+
+    valid = []
+    for line_number, organization in batch:
+        if organization.building_id not in existing_buildings:
+            result['errors'].append({'line': line_number, 'detail': 'Building not found'})
+        elif not set(organization.activities) <= tree.names.keys():
+            result['errors'].append(
+                {'line': line_number, 'detail': 'One or more activities not found'},
+            )
+        else:
+            valid.append((line_number, organization))
+
+    if not valid:
+        return
+
+    try:
+        await _insert_batch(valid, session)
+        await session.commit()
+    except (DBAPIError, asyncpg.PostgresError):
+        await session.rollback()
+    else:
+        result['created'] += len(valid)
+        return
+
+    # Пакет отклонён целиком: повторяем построчно в точках сохранения, чтобы
+    # отклонить только строки, на которых ошибается база
+    for line_number, organization in valid:
+        try:
+            async with session.begin_nested():
+                await _insert_organization(organization, session)
+        except DBAPIError as e:
+            result['errors'].append({'line': line_number, 'detail': str(e.orig)})
+        else:
+            result['created'] += 1
+    await session.commit()
+
+
+async def _insert_batch(valid: list[tuple[int, OrganizationCreate]], session: AsyncSession) -> None:
+    organization_ids = (
+        await session.scalars(
+            insert(Organization).returning(Organization.id, sort_by_parameter_order=True),
+            [
+                {'name': organization.name, 'building_id': organization.building_id}
+                for _, organization in valid
+            ],
+        )
+    ).all()
+
+    connection = await (await session.connection()).get_raw_connection()
+    await _copy(
+        connection.driver_connection,
+        OrganizationPhone.__tablename__,
+        ['organization_id', 'phone_number'],
+        (
+            (organization_id, phone)
+            for organization_id, (_, organization) in zip(organization_ids, valid, strict=True)
+            for phone in organization.phones
+        ),
+    )
+    await _copy(
+        connection.driver_connection,
+        organization_activity.name,
+        ['organization_id', 'activity_id'],
+        (
+            (organization_id, activity_id)
+            for organization_id, (_, organization) in zip(organization_ids, valid, strict=True)
+            for activity_id in set(organization.activities)
+        ),
+    )
+
+
+async def _insert_organization(organization: OrganizationCreate, session: AsyncSession) -> None:
+    organization_id = await session.scalar(
+        insert(Organization).returning(Organization.id),
+        {'name': organization.name, 'building_id': organization.building_id},
+    )
+    if organization.phones:
+        await session.execute(
+            insert(OrganizationPhone.__table__),
+            [
+                {'organization_id': organization_id, 'phone_number': phone}
+                for phone in organization.phones
+            ],
+        )
+    if organization.activities:
+        await session.execute(
+            insert(organization_activity),
+            [
+                {'organization_id': organization_id, 'activity_id': activity_id}
+                for activity_id in set(organization.activities)
+            ],
+        )
+
+
+async def _copy(connection, table: str, columns: list[str], records: Iterable[tuple]) -> None:
+    records = list(records)
+    if records:
+        await connection.copy_records_to_table(table, records=records, columns=columns)
+
+
+def _format_error(error: ValidationError) -> str:
+    return '; '.join(
+        f'{".".join(str(part) for part in item["loc"]) or "body"}: {item["msg"]}'
+        for item in error.errors()
+    )
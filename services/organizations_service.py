@@ -1,81 +1,607 @@
+import csv
+import io
+import json
+import sys
+from collections.abc import AsyncIterator, Iterable, Sequence
+
+from cache import ORGANIZATIONS_NAMESPACE, TILES_NAMESPACE, response_cache
+from db import open_read_session
 from fastapi import HTTPException
+from metrics import measure_serialization
 from models import Activity, Building, Organization, OrganizationPhone, organization_activity
-from schemas import OrganizationCreate, OrganizationOut
-from sqlalchemy import bindparam, func, select
-from sqlalchemy.orm import Session
+from schemas import (
+    ExportFormat,
+    NameSearchMode,
+    OrganizationBatchOut,
+    OrganizationCreate,
+    OrganizationFilter,
+    OrganizationMatchOut,
+    OrganizationNearbyOut,
+    OrganizationOut,
+    Page,
+)
+from serialization import organization_item
+from services.activity_service import activity_tree_cache
+from services.buildings_service import in_bounding_box, in_radius, paginate_nearby
+from services.pagination import OrderKey, paginate
+from sqlalchemy import (
+    ARRAY,
+    JSON,
+    ColumnElement,
+    Float,
+    Integer,
+    Select,
+    String,
+    Text,
+    any_,
+    cast,
+    func,
+    literal,
+    literal_column,
+    or_,
+    select,
+)
+from sqlalchemy.dialects.postgresql import REGCONFIG, aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
 
+# Стратегия загрузки связей для OrganizationOut: здание подтягивается JOIN'ом,
+# телефоны и виды деятельности - отдельными IN-запросами. Итого 3 запроса на
+# ответ независимо от количества организаций.
+ORGANIZATION_COLLECTION_LOAD_OPTIONS = (
+    selectinload(Organization.phones),
+    selectinload(Organization.activities),
+)
+ORGANIZATION_LOAD_OPTIONS = (
+    joinedload(Organization.building),
+    *ORGANIZATION_COLLECTION_LOAD_OPTIONS,
+)
 
-def get_organizations_by_building(building: int, session: Session) -> list[OrganizationOut]:
-    return session.query(Organization).filter(Organization.building_id == building).all()
+# Значение pg_trgm по умолчанию
+DEFAULT_SIMILARITY_THRESHOLD = 0.3
+# Должна совпадать с конфигурацией в organization_search_document()
+SEARCH_CONFIG = 'simple'
 
+# Строк на одну выборку из серверного курсора при выгрузке
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CSV_COLUMNS = (
+    'id',
+    'name',
+    'building_id',
+    'address',
+    'longitude',
+    'latitude',
+    'phones',
+    'activities',
+)
 
-def get_organization_by_id(gid: int, session: Session) -> OrganizationOut:
-    organization = session.query(Organization).get(gid)
-    if organization is None:
-        raise HTTPException(status_code=404, detail='Organization not found')
-    return organization
 
+async def _paginate_organizations(
+    query: Select,
+    cursor: str | None,
+    limit: int,
+    session: AsyncSession,
+    order_by: list[OrderKey] | None = None,
+    options: tuple = ORGANIZATION_LOAD_OPTIONS,
+) -> Page[OrganizationOut]:
+    rows, next_cursor = await paginate(
+        query.options(*options),
+        order_by=order_by or [(Organization.id, False)],
+        cursor=cursor,
+        limit=limit,
+        session=session,
+    )
+    return {'items': [organization_item(row[0]) for row in rows], 'next_cursor': next_cursor}
 
-def get_organizations_by_name(name: str, session: Session) -> list[OrganizationOut]:
-    organization = session.query(Organization).filter(Organization.name.op('%')(name)).all()
-    if organization is None:
-        raise HTTPException(status_code=404, detail='Organization not found')
-    return organization
+
+def _json_object(**fields: ColumnElement) -> ColumnElement:
+    # Ключи подставляются литералами: у параметров json_build_object нет типа
+    arguments = []
+    for key, value in fields.items():
+        arguments.extend((literal_column(f"'{key}'"), value))
+    return func.json_build_object(*arguments)
 
 
-def get_organizations_by_activity(activity: int, session: Session) -> list[OrganizationOut]:
-    activity_children = (
-        select(Activity)
-        .where(Activity.id == bindparam('start_id'))
-        .cte(name='activity_children', recursive=True)
+def _json_array(value: ColumnElement, order_by: ColumnElement) -> ColumnElement:
+    return func.coalesce(
+        func.json_agg(aggregate_order_by(value, order_by)),
+        literal_column("'[]'::json"),
     )
 
-    recursive_part = select(Activity).join(
-        activity_children,
-        Activity.parent_id == activity_children.c.id,
+
+def _organization_document() -> ColumnElement:
+    """JSON document of an organization with the same shape as OrganizationOut."""
+    phones = (
+        select(_json_array(OrganizationPhone.phone_number, OrganizationPhone.id))
+        .where(OrganizationPhone.organization_id == Organization.id)
+        .scalar_subquery()
+    )
+    activities = (
+        select(_json_array(_json_object(id=Activity.id, name=Activity.name), Activity.id))
+        .join(organization_activity, organization_activity.c.activity_id == Activity.id)
+        .where(organization_activity.c.organization_id == Organization.id)
+        .scalar_subquery()
+    )
+    building = _json_object(
+        id=Building.id,
+        address=Building.address,
+        geolocation=cast(func.ST_AsGeoJSON(Building.geolocation, 15), JSON),
     )
 
-    activity_children = activity_children.union_all(recursive_part)
+    return _json_object(
+        id=Organization.id,
+        name=Organization.name,
+        building=building,
+        phones=phones,
+        activities=activities,
+    )
+
+
+async def _paginate_organizations_json(
+    where: ColumnElement,
+    cursor: str | None,
+    limit: int,
+    session: AsyncSession,
+) -> bytes:
+    """Render a page of organizations as JSON built entirely by Postgres.
 
+    Skips ORM hydration and Pydantic validation; the result is a ready
+    `Page[OrganizationOut]` body.
+    """
     query = (
-        select(Organization)
-        .join(organization_activity)
-        .where(
-            organization_activity.c.activity_id.in_(select(activity_children.c.id)),
+        select(cast(_organization_document(), Text))
+        .select_from(Organization)
+        .join(Building, Building.id == Organization.building_id)
+        .where(where)
+    )
+    rows, next_cursor = await paginate(
+        query,
+        order_by=[(Organization.id, False)],
+        cursor=cursor,
+        limit=limit,
+        session=session,
+    )
+
+    with measure_serialization():
+        items = ','.join(row[0] for row in rows)
+        return f'{{"items":[{items}],"next_cursor":{json.dumps(next_cursor)}}}'.encode()
+
+
+async def _activity_filter(activity: int, session: AsyncSession) -> ColumnElement | None:
+    # Потомки вида деятельности (включая его самого) берутся из кэша дерева
+    tree = await activity_tree_cache.get(session)
+    activity_ids = tree.descendants.get(activity)
+    if not activity_ids:
+        return None
+
+    return Organization.id.in_(
+        select(organization_activity.c.organization_id).where(
+            organization_activity.c.activity_id
+            == any_(literal(sorted(activity_ids), ARRAY(Integer))),
+        ),
+    )
+
+
+def _bounding_box_filter(
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+) -> ColumnElement:
+    return Organization.building_id.in_(
+        select(Building.id).where(in_bounding_box(min_lat, min_lon, max_lat, max_lon)),
+    )
+
+
+def _radius_filter(lat: float, lon: float, radius_m: float) -> ColumnElement:
+    return Organization.building_id.in_(
+        select(Building.id).where(in_radius(lat, lon, radius_m)),
+    )
+
+
+async def get_organizations_by_building(
+    building: int,
+    cursor: str | None,
+    limit: int,
+    session: AsyncSession,
+) -> Page[OrganizationOut]:
+    query = select(Organization).where(Organization.building_id == building)
+
+    return await _paginate_organizations(query, cursor, limit, session)
+
+
+async def get_organization_by_id(gid: int, session: AsyncSession) -> OrganizationOut:
+    organization = await session.get(Organization, gid, options=ORGANIZATION_LOAD_OPTIONS)
+    if organization is None:
+        raise HTTPException(status_code=404, detail='Organization not found')
+    return organization_item(organization)
+
+
+async def get_organizations_by_ids(
+    ids: list[int],
+    session: AsyncSession,
+) -> OrganizationBatchOut:
+    """Load organizations in request order with a fixed number of queries."""
+    ids = list(dict.fromkeys(ids))
+    organizations = (
+        await session.scalars(
+            select(Organization)
+            .where(Organization.id == any_(literal(ids, ARRAY(Integer))))
+            .options(*ORGANIZATION_LOAD_OPTIONS),
         )
-        .distinct()
+    ).all()
+    by_id = {organization.id: organization for organization in organizations}
+
+    return {
+        'items': [organization_item(by_id[gid]) for gid in ids if gid in by_id],
+        'missing': [gid for gid in ids if gid not in by_id],
+    }
+
+
+def _next_prefix(prefix: str) -> str | None:
+    """Smallest string greater than every string starting with the prefix."""
+    for index in range(len(prefix) - 1, -1, -1):
+        if ord(prefix[index]) < sys.maxunicode:
+            return prefix[:index] + chr(ord(prefix[index]) + 1)
+    return None
+
+
+async def _set_similarity_threshold(
+    setting: str,
+    threshold: float,
+    session: AsyncSession,
+) -> None:
+    # Порог задаётся для операторов % и <%, чтобы фильтр шёл по GIN индексу.
+    # Действует до конца транзакции
+    await session.execute(select(func.set_config(setting, str(threshold), True)))
+
+
+async def get_organizations_by_name(
+    name: str,
+    mode: NameSearchMode,
+    threshold: float,
+    cursor: str | None,
+    limit: int,
+    session: AsyncSession,
+) -> Page[OrganizationMatchOut]:
+    query = select(Organization)
+
+    match mode:
+        case NameSearchMode.FUZZY:
+            await _set_similarity_threshold('pg_trgm.similarity_threshold', threshold, session)
+            score = func.similarity(Organization.name, name, type_=Float)
+            query = query.where(Organization.name.op('%')(name))
+            order_by = [(score, True), (Organization.id, False)]
+        case NameSearchMode.WORD:
+            await _set_similarity_threshold('pg_trgm.word_similarity_threshold', threshold, session)
+            score = func.word_similarity(name, Organization.name, type_=Float)
+            query = query.where(literal(name).op('<%')(Organization.name))
+            order_by = [(score, True), (Organization.id, False)]
+        case NameSearchMode.PREFIX:
+            # Диапазон по lower(name) COLLATE "C" читается из btree индекса уже
+            # в нужном порядке, поэтому автодополнение не зависит от числа совпадений
+            prefix = name.lower()
+            key = func.lower(Organization.name, type_=String).collate('C')
+            query = query.where(key >= prefix)
+            upper_bound = _next_prefix(prefix)
+            if upper_bound is not None:
+                query = query.where(key < upper_bound)
+            score = func.similarity(Organization.name, name, type_=Float)
+            order_by = [(key, False), (Organization.id, False)]
+
+    rows, next_cursor = await paginate(
+        query.add_columns(score).options(*ORGANIZATION_LOAD_OPTIONS),
+        order_by=order_by,
+        cursor=cursor,
+        limit=limit,
+        session=session,
+    )
+
+    return {
+        'items': [{'organization': organization_item(row[0]), 'score': row[1]} for row in rows],
+        'next_cursor': next_cursor,
+    }
+
+
+async def search_organizations(
+    q: str,
+    threshold: float,
+    cursor: str | None,
+    limit: int,
+    session: AsyncSession,
+) -> Page[OrganizationMatchOut]:
+    """Search by name, activity names and address.
+
+    Full-text matches on the search document are combined with trigram matches
+    on the name, so typos in the name still find the organization. Both
+    conditions are served by GIN indexes.
+    """
+    await _set_similarity_threshold('pg_trgm.similarity_threshold', threshold, session)
+    ts_query = func.websearch_to_tsquery(literal(SEARCH_CONFIG, REGCONFIG), q)
+    score = func.ts_rank(Organization.search_document, ts_query, type_=Float) + func.similarity(
+        Organization.name,
+        q,
+        type_=Float,
+    )
+    query = select(Organization).where(
+        or_(
+            Organization.search_document.bool_op('@@')(ts_query),
+            Organization.name.op('%')(q),
+        ),
+    )
+
+    rows, next_cursor = await paginate(
+        query.add_columns(score).options(*ORGANIZATION_LOAD_OPTIONS),
+        order_by=[(score, True), (Organization.id, False)],
+        cursor=cursor,
+        limit=limit,
+        session=session,
     )
 
-    return session.execute(query, {'start_id': activity}).scalars().all()
+    return {
+        'items': [{'organization': organization_item(row[0]), 'score': row[1]} for row in rows],
+        'next_cursor': next_cursor,
+    }
+
+
+async def get_organizations_by_activity(
+    activity: int,
+    cursor: str | None,
+    limit: int,
+    session: AsyncSession,
+) -> Page[OrganizationOut]:
+    where = await _activity_filter(activity, session)
+    if where is None:
+        return {'items': [], 'next_cursor': None}
+
+    return await _paginate_organizations(select(Organization).where(where), cursor, limit, session)
+
+
+async def get_organizations_by_activity_json(
+    activity: int,
+    cursor: str | None,
+    limit: int,
+    session: AsyncSession,
+) -> bytes:
+    where = await _activity_filter(activity, session)
+    if where is None:
+        return b'{"items":[],"next_cursor":null}'
+
+    return await _paginate_organizations_json(where, cursor, limit, session)
 
 
-def get_organizations_by_geolocation(
+async def get_organizations_by_geolocation(
     min_lat: float,
     min_lon: float,
     max_lat: float,
     max_lon: float,
-    session: Session,
-) -> list[OrganizationOut]:
-    bounding_box = func.ST_MakeEnvelope(
-        min_lon,
-        min_lat,
-        max_lon,
-        max_lat,
-        4326,
+    cursor: str | None,
+    limit: int,
+    session: AsyncSession,
+) -> Page[OrganizationOut]:
+    query = select(Organization).where(
+        _bounding_box_filter(min_lat, min_lon, max_lat, max_lon),
     )
 
-    query = select(Organization).join(Building).where(Building.geolocation.intersects(bounding_box))
+    return await _paginate_organizations(query, cursor, limit, session)
 
-    return session.execute(query).scalars().all()
+
+async def get_organizations_by_geolocation_json(
+    min_lat: float,
+    min_lon: float,
+    max_lat: float,
+    max_lon: float,
+    cursor: str | None,
+    limit: int,
+    session: AsyncSession,
+) -> bytes:
+    where = _bounding_box_filter(min_lat, min_lon, max_lat, max_lon)
+
+    return await _paginate_organizations_json(where, cursor, limit, session)
 
 
-def create_organization(organization: OrganizationCreate, session: Session) -> OrganizationOut:
+async def get_organizations_nearby(
+    lat: float,
+    lon: float,
+    radius_m: float | None,
+    k: int | None,
+    cursor: str | None,
+    limit: int,
+    session: AsyncSession,
+) -> Page[OrganizationNearbyOut]:
+    query = select(Organization).join(Organization.building)
+    rows, next_cursor = await paginate_nearby(
+        query.options(contains_eager(Organization.building), *ORGANIZATION_COLLECTION_LOAD_OPTIONS),
+        Organization.id,
+        lat=lat,
+        lon=lon,
+        radius_m=radius_m,
+        k=k,
+        cursor=cursor,
+        limit=limit,
+        session=session,
+    )
+
+    return {
+        'items': [
+            {'organization': organization_item(organization), 'distance': row_distance}
+            for organization, row_distance, _ in rows
+        ],
+        'next_cursor': next_cursor,
+    }
+
+
+async def organization_conditions(
+    filters: OrganizationFilter,
+    session: AsyncSession,
+) -> list[ColumnElement] | None:
+    """WHERE conditions for the filters, None if nothing can match.
+
+    Every filter is a semi-join on its own index (activity on
+    organization_activity, areas on the buildings GiST index, name on the
+    trigram index, building on organizations.building_id), so the planner is
+    free to start from the most selective one.
+    """
+    bounding_box = (filters.min_lon, filters.min_lat, filters.max_lon, filters.max_lat)
+    if any(value is not None for value in bounding_box) and None in bounding_box:
+        raise HTTPException(
+            status_code=422,
+            detail='min_lon, min_lat, max_lon and max_lat must be provided together',
+        )
+    circle = (filters.lat, filters.lon, filters.radius_m)
+    if any(value is not None for value in circle) and None in circle:
+        raise HTTPException(
+            status_code=422,
+            detail='lat, lon and radius_m must be provided together',
+        )
+
+    conditions = []
+    if filters.activity is not None:
+        activity_filter = await _activity_filter(filters.activity, session)
+        if activity_filter is None:
+            return None
+        conditions.append(activity_filter)
+    if filters.building is not None:
+        conditions.append(Organization.building_id == filters.building)
+    if filters.min_lon is not None:
+        conditions.append(
+            _bounding_box_filter(
+                filters.min_lat,
+                filters.min_lon,
+                filters.max_lat,
+                filters.max_lon,
+            ),
+        )
+    if filters.radius_m is not None:
+        conditions.append(_radius_filter(filters.lat, filters.lon, filters.radius_m))
+    if filters.name is not None:
+        await _set_similarity_threshold('pg_trgm.similarity_threshold', filters.threshold, session)
+        conditions.append(Organization.name.op('%')(filters.name))
+    return conditions
+
+
+async def build_organization_query(
+    filters: OrganizationFilter,
+    session: AsyncSession,
+) -> Select | None:
+    """Compose the filters into one statement, None if nothing can match."""
+    conditions = await organization_conditions(filters, session)
+    if conditions is None:
+        return None
+    if not conditions:
+        raise HTTPException(status_code=422, detail='At least one filter must be provided')
+    return select(Organization).where(*conditions)
+
+
+async def query_organizations(
+    filters: OrganizationFilter,
+    cursor: str | None,
+    limit: int,
+    session: AsyncSession,
+) -> Page[OrganizationOut]:
+    query = await build_organization_query(filters, session)
+    if query is None:
+        return {'items': [], 'next_cursor': None}
+
+    return await _paginate_organizations(query, cursor, limit, session)
+
+
+def _export_query(export_format: ExportFormat, conditions: list[ColumnElement]) -> Select:
+    if export_format == ExportFormat.NDJSON:
+        query = (
+            select(cast(_organization_document(), Text))
+            .select_from(Organization)
+            .join(Building, Building.id == Organization.building_id)
+        )
+    else:
+        phones = (
+            select(
+                func.array_to_string(
+                    func.array_agg(
+                        aggregate_order_by(OrganizationPhone.phone_number, OrganizationPhone.id),
+                    ),
+                    ';',
+                ),
+            )
+            .where(OrganizationPhone.organization_id == Organization.id)
+            .scalar_subquery()
+        )
+        activities = (
+            select(
+                func.array_to_string(
+                    func.array_agg(aggregate_order_by(Activity.name, Activity.id)),
+                    ';',
+                ),
+            )
+            .join(organization_activity, organization_activity.c.activity_id == Activity.id)
+            .where(organization_activity.c.organization_id == Organization.id)
+            .scalar_subquery()
+        )
+        query = select(
+            Organization.id,
+            Organization.name,
+            Building.id,
+            Building.address,
+            Building.longitude,
+            Building.latitude,
+            phones,
+            activities,
+        ).join(Building, Building.id == Organization.building_id)
+
+    return query.where(*conditions).order_by(Organization.id)
+
+
+async def export_organizations(
+    export_format: ExportFormat,
+    conditions: list[ColumnElement] | None,
+    read_primary: bool = False,
+) -> AsyncIterator[bytes]:
+    """Stream all matching organizations as NDJSON lines or CSV rows.
+
+    Rows are read through a server-side cursor in EXPORT_BATCH_SIZE chunks and
+    every chunk is encoded and sent before the next one is fetched, so memory
+    does not depend on the number of organizations. The export has its own
+    session: the request session is closed before the body is streamed. It
+    reads the primary when read_primary is set, as the request session did.
+    """
+    if export_format == ExportFormat.CSV:
+        yield _csv_chunk([EXPORT_CSV_COLUMNS])
+    if conditions is None:
+        return
+
+    session = await open_read_session(read_primary)
+    async with session:
+        result = await session.stream(
+            _export_query(export_format, conditions),
+            execution_options={'yield_per': EXPORT_BATCH_SIZE},
+        )
+        async for rows in result.partitions():
+            if export_format == ExportFormat.NDJSON:
+                yield ''.join(f'{row[0]}\n' for row in rows).encode()
+            else:
+                yield _csv_chunk(rows)
+
+
+def _csv_chunk(rows: Iterable[Sequence]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def create_organization(
+    organization: OrganizationCreate,
+    session: AsyncSession,
+) -> OrganizationOut:
     # Проверяем, существование здания и активностей
-    building = session.query(Building).filter(Building.id == organization.building_id).first()
+    building = await session.get(Building, organization.building_id)
     if not building:
         raise HTTPException(status_code=404, detail='Building not found')
 
-    activities = session.query(Activity).filter(Activity.id.in_(organization.activities)).all()
+    activities = (
+        (await session.execute(select(Activity).where(Activity.id.in_(organization.activities))))
+        .scalars()
+        .all()
+    )
     if len(activities) != len(organization.activities):
         raise HTTPException(status_code=404, detail='One or more activities not found')
 
@@ -88,7 +614,8 @@ def create_organization(organization: OrganizationCreate, session: Session) -> O
     ]
 
     session.add(new_organization)
-    session.commit()
-    session.refresh(new_organization)
+    await session.commit()
+    # Счётчики организаций есть и в тайлах карты
+    await response_cache.invalidate(ORGANIZATIONS_NAMESPACE, TILES_NAMESPACE)
 
-    return organization
+    return await get_organization_by_id(new_organization.id, session)
@@ -0,0 +1,99 @@
+import base64
+import binascii
+import json
+from collections.abc import Sequence
+from typing import Annotated, Any
+
+from fastapi import HTTPException, Query
+from sqlalchemy import ColumnElement, Row, Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+CursorQuery = Annotated[str | None, Query(description='Opaque cursor from `next_cursor`')]
+LimitQuery = Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)]
+
+# Ключ сортировки: выражение и признак сортировки по убыванию
+OrderKey = tuple[ColumnElement, bool]
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    payload = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def _matches_type(value: Any, expected: type) -> bool:
+    # bool - подкласс int, а целые в JSON допустимы и для вещественных ключей
+    if isinstance(value, bool):
+        return False
+    if expected is float:
+        return isinstance(value, int | float)
+    return isinstance(value, expected)
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> list[Any]:
+    """Decode a cursor whose values must have the given Python types."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=400, detail='Invalid cursor') from None
+
+    if (
+        not isinstance(values, list)
+        or len(values) != len(types)
+        or not all(
+            _matches_type(value, expected) for value, expected in zip(values, types, strict=True)
+        )
+    ):
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+    return values
+
+
+def keyset_condition(order_by: Sequence[OrderKey], values: Sequence[Any]) -> ColumnElement:
+    """Build the "row comes after the cursor" predicate for a composite sort key.
+
+    For the key (a DESC, b ASC) and the cursor (x, y) this yields
+    `a < x OR (a = x AND b > y)`.
+    """
+    conditions = []
+    for index, (expression, descending) in enumerate(order_by):
+        value = values[index]
+        after = expression < value if descending else expression > value
+        equal = [prev == values[i] for i, (prev, _) in enumerate(order_by[:index])]
+        conditions.append(and_(*equal, after))
+    return or_(*conditions)
+
+
+async def paginate(
+    query: Select,
+    order_by: Sequence[OrderKey],
+    cursor: str | None,
+    limit: int,
+    session: AsyncSession,
+    params: dict[str, Any] | None = None,
+) -> tuple[list[Row], str | None]:
+    """Apply keyset pagination to a query.
+
+    Sort key values are appended to the selected columns, so every returned row
+    is `(entity, *extra columns, *key values)`. The last key must be unique (usually the id) to keep
+    the order total. Every key must have a SQL type (pass `type_=` to functions), it is used
+    to check the values of incoming cursors.
+    """
+    query = query.add_columns(*(expression for expression, _ in order_by))
+    if cursor is not None:
+        types = [expression.type.python_type for expression, _ in order_by]
+        query = query.where(keyset_condition(order_by, decode_cursor(cursor, types)))
+
+    query = query.order_by(
+        *(expression.desc() if descending else expression for expression, descending in order_by),
+    ).limit(limit + 1)
+
+    rows = (await session.execute(query, params)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][-len(order_by) :])
+    return rows, next_cursor
@@ -0,0 +1,70 @@
+from fastapi import HTTPException
+from geoalchemy2 import Geometry
+from models import Building
+from services.buildings_service import organization_count
+from sqlalchemy import cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Длина экватора в Web Mercator (EPSG:3857)
+WEB_MERCATOR_WIDTH = 40_075_016.685578488
+MAX_ZOOM = 22
+# Начиная с этого масштаба здания отдаются по одному, без кластеризации
+CLUSTER_MAX_ZOOM = 16
+# Число ячеек сетки кластеризации вдоль стороны тайла
+CLUSTER_GRID_CELLS = 64
+TILE_EXTENT = 4096
+TILE_LAYER = 'buildings'
+
+
+async def get_tile(z: int, x: int, y: int, session: AsyncSession) -> bytes:
+    """Render a Mapbox Vector Tile with buildings and their organization counts.
+
+    Below CLUSTER_MAX_ZOOM buildings are snapped to a grid and every cell is
+    one point feature with `building_count` and `organization_count`, so the
+    tile size depends on the grid, not on the number of buildings.
+    """
+    if not 0 <= z <= MAX_ZOOM or not (0 <= x < 2**z and 0 <= y < 2**z):
+        raise HTTPException(status_code=404, detail='Tile not found')
+
+    envelope = func.ST_TileEnvelope(z, x, y)
+    # Сравнение в плоских координатах по индексу ix_buildings_geolocation_geometry:
+    # в geography края тайлов z=0 (долготы -180 и 180) совпадают, а рёбра в 180°
+    # по долготе не задают однозначную дугу
+    geometry = cast(Building.geolocation, Geometry(geometry_type='POINT', srid=4326))
+    in_tile = geometry.intersects(func.ST_Transform(envelope, 4326))
+    point = func.ST_Transform(geometry, 3857)
+    buildings = (
+        select(
+            Building.id,
+            Building.address,
+            point.label('geom'),
+            organization_count().label('organization_count'),
+        )
+        .where(in_tile)
+        .subquery('buildings_in_tile')
+    )
+
+    if z >= CLUSTER_MAX_ZOOM:
+        features = select(
+            func.ST_AsMVTGeom(buildings.c.geom, envelope, TILE_EXTENT).label('geom'),
+            buildings.c.id,
+            buildings.c.address,
+            buildings.c.organization_count,
+        )
+    else:
+        cell = func.ST_SnapToGrid(buildings.c.geom, WEB_MERCATOR_WIDTH / 2**z / CLUSTER_GRID_CELLS)
+        features = select(
+            func.ST_AsMVTGeom(
+                func.ST_Centroid(func.ST_Collect(buildings.c.geom)),
+                envelope,
+                TILE_EXTENT,
+            ).label('geom'),
+            func.count().label('building_count'),
+            func.sum(buildings.c.organization_count).label('organization_count'),
+        ).group_by(cell)
+    features = features.subquery('features')
+
+    tile = await session.scalar(
+        select(func.ST_AsMVT(features.table_valued(), TILE_LAYER, TILE_EXTENT, 'geom')),
+    )
+    return bytes(tile or b'')
@@ -0,0 +1,185 @@
+import asyncio
+from collections.abc import Callable
+
+import pytest
+from services import activity_service
+from services.activity_service import ACTIVITY_TREE_CHANNEL, ActivityTree, ActivityTreeCache
+
+ROWS = [
+    (3, 1, 'Cars'),
+    (1, None, 'Food'),
+    (2, 1, 'Meat'),
+    (4, 3, 'Parts'),
+    (5, None, 'Auto'),
+]
+
+
+def test_build_links_parents_and_children():
+    tree = ActivityTree.build(7, ROWS)
+
+    assert tree.version == 7
+    assert tree.names[4] == 'Parts'
+    assert tree.parents == {1: None, 2: 1, 3: 1, 4: 3, 5: None}
+    assert tree.children == {1: (2, 3), 2: (), 3: (4,), 4: (), 5: ()}
+    assert tree.roots == (1, 5)
+
+
+def test_descendants_include_the_node_itself():
+    tree = ActivityTree.build(0, ROWS)
+
+    assert tree.descendants[1] == {1, 2, 3, 4}
+    assert tree.descendants[3] == {3, 4}
+    assert tree.descendants[4] == {4}
+    assert tree.descendants[5] == {5}
+
+
+def test_empty_tree():
+    tree = ActivityTree.build(0, [])
+
+    assert tree.names == {}
+    assert tree.roots == ()
+
+
+class FakeSession:
+    def __init__(self, version: int) -> None:
+        self.version = version
+
+    async def scalar(self, statement) -> int:
+        return self.version
+
+
+class PrimaryTreeCache(ActivityTreeCache):
+    """Cache whose primary is a version counter instead of a database."""
+
+    def __init__(self, primary_version: int, *, listening: bool) -> None:
+        super().__init__()
+        self.primary_version = primary_version
+        self.connected = listening
+        self.loads = 0
+
+    @property
+    def listening(self) -> bool:
+        return self.connected
+
+    def notify(self, payload: str) -> None:
+        self._on_notify(None, 0, ACTIVITY_TREE_CHANNEL, payload)
+
+    async def _reload(self) -> ActivityTree:
+        self.loads += 1
+        self._tree = ActivityTree.build(self.primary_version, ROWS)
+        return self._tree
+
+
+@pytest.mark.anyio
+async def test_notified_version_forces_reload_from_primary():
+    cache = PrimaryTreeCache(primary_version=1, listening=True)
+    replica = FakeSession(version=1)
+    await cache.get(replica)
+
+    cache.primary_version = 2
+    cache.notify('2')
+
+    assert (await cache.get(replica)).version == 2
+    assert (await cache.get(replica)).version == 2
+    assert cache.loads == 2
+
+
+@pytest.mark.anyio
+async def test_polling_ignores_lagging_replica():
+    cache = PrimaryTreeCache(primary_version=5, listening=False)
+    await cache.get(FakeSession(version=5))
+
+    assert (await cache.get(FakeSession(version=4))).version == 5
+    assert cache.loads == 1
+
+    cache.primary_version = 6
+    assert (await cache.get(FakeSession(version=6))).version == 6
+    assert cache.loads == 2
+
+
+class FakeListener:
+    def __init__(self, on_terminate: Callable[['FakeListener'], None]) -> None:
+        self.on_terminate = on_terminate
+        self.closed = False
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+    def terminate(self) -> None:
+        # Как и asyncpg, вызывает слушателей завершения при любом закрытии
+        self.closed = True
+        self.on_terminate(self)
+
+    async def close(self) -> None:
+        self.terminate()
+
+
+class FlakyListenerCache(ActivityTreeCache):
+    """Cache whose listener connection fails the given number of times."""
+
+    def __init__(self, failures: int) -> None:
+        super().__init__()
+        self.failures = failures
+        self.attempts = 0
+        self.connected = asyncio.Event()
+
+    async def _listen(self) -> None:
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise OSError('Connection refused')
+        self._listener = FakeListener(self._on_terminate)
+        self.connected.set()
+
+    async def _reload(self) -> ActivityTree:
+        self._tree = ActivityTree.build(0, ROWS)
+        return self._tree
+
+    def drop_connection(self) -> None:
+        self.connected.clear()
+        self._listener.terminate()
+
+    async def wait_listening(self) -> None:
+        async with asyncio.timeout(1):
+            await self.connected.wait()
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(activity_service, 'LISTENER_RETRY_DELAYS', (0.001, 0.004))
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures('fast_retries')
+async def test_listener_is_reconnected_after_failed_start():
+    cache = FlakyListenerCache(failures=3)
+    await cache.start()
+    assert not cache.listening
+
+    await cache.wait_listening()
+    assert cache.attempts == 4
+    await cache.stop()
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures('fast_retries')
+async def test_listener_is_reconnected_after_connection_loss():
+    cache = FlakyListenerCache(failures=0)
+    await cache.start()
+    cache.drop_connection()
+    assert not cache.listening
+
+    await cache.wait_listening()
+    assert cache.attempts == 2
+    await cache.stop()
+
+
+@pytest.mark.anyio
+@pytest.mark.usefixtures('fast_retries')
+async def test_stop_does_not_reconnect():
+    cache = FlakyListenerCache(failures=0)
+    await cache.start()
+    await cache.stop()
+    await asyncio.sleep(0.01)
+
+    assert not cache.listening
+    assert cache.attempts == 1
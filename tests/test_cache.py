@@ -0,0 +1,122 @@
+from typing import Any
+
+import pytest
+from cache import MemoryCacheBackend, ResponseCache
+from db import READ_PRIMARY_INFO, REPLICA_INFO
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeSession:
+    def __init__(self, **info: Any) -> None:
+        self.info = info
+
+
+class Producer:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def __call__(self) -> bytes:
+        self.calls += 1
+        return f'value {self.calls}'.encode()
+
+
+@pytest.fixture
+def cache() -> ResponseCache:
+    return ResponseCache(MemoryCacheBackend(max_entries=16), ttl=60)
+
+
+def test_key_is_independent_of_parameter_order():
+    assert ResponseCache.key('building', q=1, limit=50, cursor=None) == ResponseCache.key(
+        'building',
+        limit=50,
+        q=1,
+    )
+
+
+async def test_second_read_is_a_hit(cache):
+    produce = Producer()
+    first = await cache.get_or_set('organizations', 'key', produce, FakeSession())
+    second = await cache.get_or_set('organizations', 'key', produce, FakeSession())
+
+    assert first == second == b'value 1'
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'invalidations': 0}
+
+
+async def test_invalidation_starts_a_new_generation(cache):
+    produce = Producer()
+    await cache.get_or_set('organizations', 'key', produce, FakeSession())
+    await cache.get_or_set('tiles', 'key', produce, FakeSession())
+    await cache.invalidate('organizations')
+
+    assert await cache.get_or_set('organizations', 'key', produce, FakeSession()) == b'value 3'
+    assert await cache.get_or_set('tiles', 'key', produce, FakeSession()) == b'value 2'
+
+
+async def test_value_loaded_during_invalidation_stays_in_old_generation(cache):
+    calls = 0
+
+    async def produce() -> bytes:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            await cache.invalidate('organizations')
+        return f'value {calls}'.encode()
+
+    assert await cache.get_or_set('organizations', 'key', produce, FakeSession()) == b'value 1'
+    assert await cache.get_or_set('organizations', 'key', produce, FakeSession()) == b'value 2'
+
+
+async def test_read_after_write_bypasses_cache(cache):
+    produce = Producer()
+    await cache.get_or_set('organizations', 'key', produce, FakeSession())
+    value = await cache.get_or_set(
+        'organizations',
+        'key',
+        produce,
+        FakeSession(**{READ_PRIMARY_INFO: True}),
+    )
+
+    assert value == b'value 2'
+    assert cache.stats()['hits'] == 0
+
+
+async def test_replica_reads_are_not_stored_right_after_invalidation(cache):
+    produce = Producer()
+    replica = FakeSession(**{REPLICA_INFO: True})
+    await cache.invalidate('organizations')
+    await cache.get_or_set('organizations', 'key', produce, replica)
+    await cache.get_or_set('organizations', 'key', produce, replica)
+    assert produce.calls == 2
+
+    await cache.get_or_set('organizations', 'key', produce, FakeSession())
+    await cache.get_or_set('organizations', 'key', produce, replica)
+    assert produce.calls == 3
+
+
+async def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_entries=2)
+    await backend.set('a', b'1', 60)
+    await backend.set('b', b'2', 60)
+    await backend.get('a')
+    await backend.set('c', b'3', 60)
+
+    assert await backend.get('a') == b'1'
+    assert await backend.get('b') is None
+    assert await backend.get('c') == b'3'
+
+
+async def test_memory_backend_expires_entries():
+    backend = MemoryCacheBackend(max_entries=2)
+    await backend.set('a', b'1', -1)
+
+    assert await backend.get('a') is None
+
+
+async def test_counters_are_not_evicted():
+    backend = MemoryCacheBackend(max_entries=1)
+    assert await backend.incr('generation:organizations') == 1
+    await backend.set('a', b'1', 60)
+    await backend.set('b', b'2', 60)
+
+    assert await backend.get_counter('generation:organizations') == 1
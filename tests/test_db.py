@@ -0,0 +1,97 @@
+import asyncio
+
+import db
+import pytest
+from db import REPLICA_INFO, InstrumentedQueuePool, ReplicaRouter
+from sqlalchemy import make_url
+from sqlalchemy.util import greenlet_spawn
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeConnection:
+    def rollback(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def _pool(max_overflow: int) -> InstrumentedQueuePool:
+    return InstrumentedQueuePool(FakeConnection, pool_size=1, max_overflow=max_overflow, timeout=1)
+
+
+async def test_idle_connection_is_not_a_wait():
+    pool = _pool(max_overflow=0)
+    connection = await greenlet_spawn(pool.connect)
+    await greenlet_spawn(connection.close)
+    connection = await greenlet_spawn(pool.connect)
+    await greenlet_spawn(connection.close)
+
+    assert pool.stats()['checkouts'] == 2
+    assert pool.stats()['waits'] == 0
+
+
+async def test_overflow_connection_is_not_a_wait():
+    pool = _pool(max_overflow=1)
+    connections = [await greenlet_spawn(pool.connect) for _ in range(2)]
+
+    assert pool.stats()['overflow'] == 1
+    assert pool.stats()['waits'] == 0
+    for connection in connections:
+        await greenlet_spawn(connection.close)
+
+
+async def test_exhausted_pool_counts_waiting_checkout():
+    pool = _pool(max_overflow=0)
+    first = await greenlet_spawn(pool.connect)
+    second = asyncio.create_task(greenlet_spawn(pool.connect))
+    await asyncio.sleep(0.01)
+
+    assert pool.stats()['waiting'] == 1
+    assert pool.stats()['waits'] == 1
+
+    await greenlet_spawn(first.close)
+    await greenlet_spawn((await second).close)
+    stats = pool.stats()
+
+    assert stats['waiting'] == 0
+    assert stats['checkouts'] == 2
+    assert stats['waits'] == 1
+    assert stats['wait_seconds_total'] == stats['wait_seconds_max'] > 0
+
+
+@pytest.fixture
+async def unreachable_replica():
+    # На порту 1 никто не слушает: подключение сразу получает отказ
+    router = ReplicaRouter([make_url('postgresql://postgres@127.0.0.1:1/replica')])
+    yield router
+    await router.dispose()
+
+
+def _connection_attempts(router: ReplicaRouter) -> int:
+    return router.engines[0].pool.stats()['checkouts']
+
+
+async def test_unreachable_replica_falls_back_to_primary(unreachable_replica):
+    session = await unreachable_replica.open_session()
+    async with session:
+        assert REPLICA_INFO not in session.info
+        assert session.bind is db.read_session_factory.kw['bind']
+
+    assert _connection_attempts(unreachable_replica) == 1
+
+
+async def test_unreachable_replica_is_skipped_until_retry(unreachable_replica):
+    for _ in range(2):
+        await (await unreachable_replica.open_session()).close()
+
+    assert _connection_attempts(unreachable_replica) == 1
+
+
+async def test_unreachable_replica_is_retried_after_timeout(unreachable_replica, monkeypatch):
+    monkeypatch.setattr(db, 'REPLICA_RETRY_AFTER', 0)
+    for _ in range(2):
+        await (await unreachable_replica.open_session()).close()
+
+    assert _connection_attempts(unreachable_replica) == 2
@@ -0,0 +1,32 @@
+from collections.abc import AsyncIterator
+
+import pytest
+from services.import_service import iter_lines
+
+pytestmark = pytest.mark.anyio
+
+
+async def _chunks(*chunks: bytes) -> AsyncIterator[bytes]:
+    for chunk in chunks:
+        yield chunk
+
+
+async def _lines(*chunks: bytes) -> list[bytes]:
+    return [line async for line in iter_lines(_chunks(*chunks))]
+
+
+async def test_lines_split_across_chunks():
+    assert await _lines(b'{"a":', b'1}\n{"b"', b':2}\n') == [b'{"a":1}', b'{"b":2}']
+
+
+async def test_last_line_without_newline():
+    assert await _lines(b'one\ntwo') == [b'one', b'two']
+
+
+async def test_empty_lines_are_kept():
+    assert await _lines(b'one\n\n', b'\ntwo\n') == [b'one', b'', b'', b'two']
+
+
+async def test_empty_stream():
+    assert await _lines() == []
+    assert await _lines(b'') == []
@@ -0,0 +1,59 @@
+from metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_counter_renders_labelled_samples():
+    counter = Counter('requests_total', 'Requests')
+    counter.inc(route='/b')
+    counter.inc(2, route='/a')
+    counter.inc(route='/a')
+
+    assert list(counter.render()) == [
+        '# HELP requests_total Requests',
+        '# TYPE requests_total counter',
+        'requests_total{route="/a"} 3',
+        'requests_total{route="/b"} 1',
+    ]
+
+
+def test_counter_reads_callback():
+    counter = Counter('pool_checkouts_total', 'Checkouts', lambda: {(('pool', 'primary'),): 5})
+
+    assert list(counter.samples()) == ['pool_checkouts_total{pool="primary"} 5']
+
+
+def test_gauge_and_float_values():
+    gauge = Gauge('in_flight', 'In flight')
+    gauge.inc(1.5)
+    gauge.dec()
+
+    assert list(gauge.render())[1:] == ['# TYPE in_flight gauge', 'in_flight 0.5']
+
+
+def test_label_values_are_escaped():
+    counter = Counter('errors_total', 'Errors')
+    counter.inc(detail='a "quoted"\\path\nline')
+
+    assert list(counter.samples()) == [r'errors_total{detail="a \"quoted\"\\path\nline"} 1']
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('latency_seconds', 'Latency', (0.1, 1.0))
+    histogram.observe(0.05, route='/')
+    histogram.observe(0.5, route='/')
+    histogram.observe(5, route='/')
+
+    assert list(histogram.samples()) == [
+        'latency_seconds_bucket{route="/",le="0.1"} 1',
+        'latency_seconds_bucket{route="/",le="1"} 2',
+        'latency_seconds_bucket{route="/",le="+Inf"} 3',
+        'latency_seconds_sum{route="/"} 5.55',
+        'latency_seconds_count{route="/"} 3',
+    ]
+
+
+def test_registry_renders_all_metrics():
+    registry = Registry()
+    registry.register(Gauge('a', 'A')).inc()
+    registry.register(Counter('b', 'B'))
+
+    assert registry.render() == '# HELP a A\n# TYPE a gauge\na 1\n# HELP b B\n# TYPE b counter\n'
@@ -0,0 +1,92 @@
+import json
+import sys
+
+import pytest
+from models import Activity, Building, Organization, OrganizationPhone
+from schemas import OrganizationOut, Page
+from serialization import dump_json
+from services import organizations_service
+from services.organizations_service import _next_prefix
+
+
+@pytest.mark.parametrize(
+    ('prefix', 'expected'),
+    [
+        ('caf', 'cag'),
+        ('a', 'b'),
+        ('z', '{'),
+        (f'ab{chr(sys.maxunicode)}', 'ac'),
+        (chr(sys.maxunicode), None),
+        ('', None),
+    ],
+)
+def test_next_prefix(prefix, expected):
+    assert _next_prefix(prefix) == expected
+
+
+def test_next_prefix_bounds_all_completions():
+    upper = _next_prefix('caf')
+    assert all('caf' <= word < upper for word in ['caf', 'cafe', f'caf{chr(sys.maxunicode)}'])
+    assert not upper > 'cag'
+
+
+# Точка с длинной дробной частью: координаты из ST_AsGeoJSON и ST_X/ST_Y должны совпасть
+LON, LAT = 37.617589876543214, 55.755814123456789
+
+
+@pytest.mark.anyio
+async def test_postgres_json_matches_orm_page(session):
+    root = Activity(name='Еда')
+    child = Activity(name='Мясная "продукция"', parent=root)
+    building = Building(address='ул. Ленина, 1\\2', geolocation=f'SRID=4326;POINT({LON} {LAT})')
+    session.add_all(
+        [
+            Organization(
+                name=f'ООО "Рога и копыта" {index}',
+                building=building,
+                phones=[
+                    OrganizationPhone(phone_number=f'8-800-555-35-3{index}'),
+                    OrganizationPhone(phone_number='2-222-222'),
+                ],
+                activities=[child, root] if index % 2 else [],
+            )
+            for index in range(3)
+        ],
+    )
+    await session.flush()
+    # Страницы ORM должны читаться из базы, а не из identity map
+    session.expunge_all()
+
+    bbox = {
+        'min_lon': LON - 1e-6,
+        'min_lat': LAT - 1e-6,
+        'max_lon': LON + 1e-6,
+        'max_lat': LAT + 1e-6,
+    }
+    pages = []
+    cursor = None
+    for _ in range(3):
+        orm_page = await organizations_service.get_organizations_by_geolocation(
+            **bbox,
+            cursor=cursor,
+            limit=2,
+            session=session,
+        )
+        json_page = await organizations_service.get_organizations_by_geolocation_json(
+            **bbox,
+            cursor=cursor,
+            limit=2,
+            session=session,
+        )
+        validated = Page[OrganizationOut].model_validate(orm_page).model_dump(mode='json')
+
+        assert json.loads(json_page) == json.loads(dump_json(orm_page))
+        assert json.loads(json_page) == validated
+        pages.append(validated)
+        cursor = orm_page['next_cursor']
+        if cursor is None:
+            break
+
+    items = [item for page in pages for item in page['items']]
+    assert len(items) >= 3
+    assert items[0]['building']['geolocation'] == {'type': 'Point', 'coordinates': [LON, LAT]}
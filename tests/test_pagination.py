@@ -0,0 +1,62 @@
+import pytest
+from fastapi import HTTPException
+from models import Organization
+from services.pagination import decode_cursor, encode_cursor, keyset_condition
+from sqlalchemy import Float, func
+from sqlalchemy.dialects import postgresql
+
+
+def test_cursor_round_trip():
+    values = [0.75, 'Café', 42]
+    assert decode_cursor(encode_cursor(values), [float, str, int]) == values
+
+
+def test_cursor_has_no_padding():
+    assert '=' not in encode_cursor([1])
+
+
+@pytest.mark.parametrize('cursor', ['!!!', 'bm90IGpzb24', encode_cursor([1])[:-2]])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, [int])
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize(
+    ('values', 'types'),
+    [
+        ([1, 2], [int]),
+        (['1'], [int]),
+        ([True], [int]),
+        ([1.5], [int]),
+        ([None], [str]),
+        ({'id': 1}, [int]),
+    ],
+)
+def test_cursor_with_wrong_values_is_rejected(values, types):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(encode_cursor(values) if isinstance(values, list) else 'eyJpZCI6MX0', types)
+    assert error.value.status_code == 400
+
+
+def test_integer_is_accepted_for_float_key():
+    assert decode_cursor(encode_cursor([1, 2]), [float, int]) == [1, 2]
+
+
+def _compile(condition) -> str:
+    return str(
+        condition.compile(dialect=postgresql.dialect(), compile_kwargs={'literal_binds': True}),
+    )
+
+
+def test_keyset_condition_single_key():
+    assert _compile(keyset_condition([(Organization.id, False)], [10])) == 'organizations.id > 10'
+
+
+def test_keyset_condition_mixed_directions():
+    score = func.similarity(Organization.name, 'cafe', type_=Float)
+    condition = keyset_condition([(score, True), (Organization.id, False)], [0.5, 10])
+    assert _compile(condition) == (
+        "similarity(organizations.name, 'cafe') < 0.5 "
+        "OR similarity(organizations.name, 'cafe') = 0.5 AND organizations.id > 10"
+    )
@@ -0,0 +1,99 @@
+import json
+from collections.abc import Callable, Iterator
+
+import pytest
+from benchmarks.service_bench import load_samples
+from models import Organization
+from schemas import OrganizationFilter
+from services import organizations_service
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+pytestmark = pytest.mark.anyio
+
+GEOLOCATION_INDEX = 'idx_buildings_geolocation'
+TRIGRAM_INDEX = 'organizations_trgm_idx'
+ACTIVITY_INDEX = 'ix_organization_activity_activity_id'
+BUILDING_INDEX = 'ix_organizations_building_id_id'
+
+# На меньших данных планировщику дешевле прочитать таблицы целиком, чем идти по индексам;
+# нужна база, наполненная populate_test_data.py
+MIN_ORGANIZATIONS = 10_000
+LIMIT = 50
+# Половина стороны bbox в градусах
+BOX = 0.01
+
+
+def _bbox(samples: dict) -> dict:
+    return {
+        'min_lon': samples['lon'] - BOX,
+        'min_lat': samples['lat'] - BOX,
+        'max_lon': samples['lon'] + BOX,
+        'max_lat': samples['lat'] + BOX,
+    }
+
+
+def _circle(samples: dict) -> dict:
+    return {'lat': samples['lat'], 'lon': samples['lon'], 'radius_m': BOX * 111_000}
+
+
+CASES: dict[str, tuple[Callable[[dict], dict], set[str]]] = {
+    'activity': (lambda samples: {'activity': samples['activity_id']}, {ACTIVITY_INDEX}),
+    'building': (lambda samples: {'building': samples['building_id']}, {BUILDING_INDEX}),
+    'bbox': (_bbox, {GEOLOCATION_INDEX}),
+    'radius': (_circle, {GEOLOCATION_INDEX}),
+    'name': (lambda samples: {'name': samples['name']}, {TRIGRAM_INDEX}),
+    'activity_bbox': (
+        lambda samples: {'activity': samples['activity_id'], **_bbox(samples)},
+        {GEOLOCATION_INDEX},
+    ),
+    'name_radius': (
+        lambda samples: {'name': samples['name'], **_circle(samples)},
+        {GEOLOCATION_INDEX},
+    ),
+    'activity_name_bbox': (
+        lambda samples: {
+            'activity': samples['activity_id'],
+            'name': samples['name'],
+            **_bbox(samples),
+        },
+        {GEOLOCATION_INDEX},
+    ),
+}
+
+
+def iter_index_names(plan: dict) -> Iterator[str]:
+    if 'Index Name' in plan:
+        yield plan['Index Name']
+    for child in plan.get('Plans', []):
+        yield from iter_index_names(child)
+
+
+async def explain(filters: OrganizationFilter, session: AsyncSession) -> dict:
+    query = await organizations_service.build_organization_query(filters, session)
+    # Так же, как в _paginate_organizations: первая страница по id
+    query = query.order_by(Organization.id).limit(LIMIT + 1)
+    statement = query.compile(
+        dialect=session.bind.dialect,
+        compile_kwargs={'literal_binds': True},
+    )
+    connection = await session.connection()
+    result = await connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {statement}')
+    plan = result.scalar_one()
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]['Plan']
+
+
+@pytest.fixture
+async def samples(session):
+    organizations = await session.scalar(select(func.count()).select_from(Organization))
+    if organizations < MIN_ORGANIZATIONS:
+        pytest.skip(f'Query plans need at least {MIN_ORGANIZATIONS} organizations')
+    return await load_samples(session)
+
+
+@pytest.mark.parametrize(('make_filters', 'expected'), CASES.values(), ids=CASES.keys())
+async def test_query_uses_expected_indexes(session, samples, make_filters, expected):
+    plan = await explain(OrganizationFilter(**make_filters(samples)), session)
+    used = set(iter_index_names(plan))
+
+    assert expected <= used, json.dumps(plan, indent=2)
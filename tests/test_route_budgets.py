@@ -0,0 +1,233 @@
+import math
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+import httpx
+import pytest
+from cache import MemoryCacheBackend, response_cache
+from db import async_engine, get_read_session
+from main import app
+from metrics import request_statements
+from models import Activity, Building, Organization, OrganizationPhone
+from services import activity_service, organizations_service
+from services.activity_service import ActivityTreeCache, activity_tree_cache
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+pytestmark = pytest.mark.anyio
+
+# Предельное число SQL-запросов на GET-запрос, не зависящее от размера выдачи.
+# ORM-страница организаций - основной запрос и два selectin (плюс set_config порога
+# похожести для поиска по имени), здания с embed - ещё три уровня selectin,
+# JSON из PostgreSQL, тайлы и дерево видов деятельности - один запрос
+ROUTE_BUDGETS = {
+    '/organizations/name': 4,
+    '/organizations/search': 4,
+    '/organizations/query': 4,
+    '/organizations/export': 1,
+    '/organizations/building': 3,
+    '/organizations/activity': 1,
+    '/organizations/location': 1,
+    '/organizations/nearby': 3,
+    '/organizations/batch': 3,
+    '/organizations/{gid}': 3,
+    '/buildings/location': 4,
+    '/buildings/nearby': 4,
+    '/buildings/{gid}': 4,
+    '/activities/': 1,
+    '/activities/{gid}': 1,
+    '/tiles/{z}/{x}/{y}': 1,
+    '/metrics': 0,
+    '/metrics/pool': 0,
+}
+
+# Точка вдали от реальных данных, чтобы выдача зависела только от созданных строк
+LON, LAT = -30.123, -40.456
+NAME = 'Квазиудача'
+TILE_ZOOM = 16
+
+
+@dataclass
+class Seed:
+    root_id: int
+    child_id: int
+    building_ids: list[int]
+    organization_ids: list[int]
+
+
+def _tile(zoom: int) -> tuple[int, int]:
+    scale = 2**zoom
+    x = int((LON + 180) / 360 * scale)
+    y = int((1 - math.asinh(math.tan(math.radians(LAT))) / math.pi) / 2 * scale)
+    return x, y
+
+
+def _requests(seed: Seed) -> list[tuple[str, str]]:
+    building_id = seed.building_ids[0]
+    bbox = {
+        'min_lon': LON - 0.01,
+        'min_lat': LAT - 0.01,
+        'max_lon': LON + 0.01,
+        'max_lat': LAT + 0.01,
+    }
+    circle = {'lat': LAT, 'lon': LON, 'radius_m': 1000}
+    x, y = _tile(TILE_ZOOM)
+    ids = seed.organization_ids[:100]
+    return [
+        ('/organizations/name', f'/organizations/name?q={NAME}'),
+        ('/organizations/name', f'/organizations/name?q={NAME}&mode=prefix'),
+        ('/organizations/search', f'/organizations/search?q={NAME}'),
+        ('/organizations/query', f'/organizations/query?activity={seed.root_id}'),
+        (
+            '/organizations/query',
+            '/organizations/query?'
+            + urlencode({'activity': seed.root_id, 'name': NAME, **bbox, **circle}),
+        ),
+        ('/organizations/export', f'/organizations/export?activity={seed.root_id}'),
+        ('/organizations/export', f'/organizations/export?format=csv&{urlencode(bbox)}'),
+        ('/organizations/building', f'/organizations/building?q={building_id}'),
+        ('/organizations/activity', f'/organizations/activity?q={seed.root_id}'),
+        ('/organizations/location', f'/organizations/location?{urlencode(bbox)}'),
+        ('/organizations/nearby', f'/organizations/nearby?{urlencode(circle)}'),
+        ('/organizations/nearby', f'/organizations/nearby?lat={LAT}&lon={LON}&k=50'),
+        ('/organizations/batch', '/organizations/batch?' + urlencode({'ids': ids}, doseq=True)),
+        ('/organizations/{gid}', f'/organizations/{seed.organization_ids[0]}'),
+        ('/buildings/location', f'/buildings/location?{urlencode(bbox)}'),
+        ('/buildings/location', f'/buildings/location?embed=true&{urlencode(bbox)}'),
+        ('/buildings/nearby', f'/buildings/nearby?embed=true&{urlencode(circle)}'),
+        ('/buildings/{gid}', f'/buildings/{building_id}?embed=true'),
+        ('/activities/', '/activities/'),
+        ('/activities/{gid}', f'/activities/{seed.root_id}'),
+        ('/tiles/{z}/{x}/{y}', f'/tiles/{TILE_ZOOM}/{x}/{y}'),
+        ('/tiles/{z}/{x}/{y}', f'/tiles/{TILE_ZOOM - 6}/{x >> 6}/{y >> 6}'),
+        ('/metrics', '/metrics'),
+        ('/metrics/pool', '/metrics/pool'),
+    ]
+
+
+def _statements(route: str) -> float | None:
+    """Total SQL statements recorded by MetricsMiddleware for the GET route."""
+    prefix = f'{request_statements.name}_sum{{method="GET",route="{route}"}} '
+    for line in request_statements.samples():
+        if line.startswith(prefix):
+            return float(line.removeprefix(prefix))
+    return None
+
+
+async def _seed(size: int, session: AsyncSession) -> Seed:
+    """Create `size` buildings with `size` organizations each."""
+    root = Activity(name='Еда')
+    child = Activity(name='Мясная продукция', parent=root)
+    buildings = [
+        Building(
+            address=f'ул. Ленина, {index}',
+            geolocation=f'SRID=4326;POINT({LON + index * 1e-5} {LAT})',
+        )
+        for index in range(size)
+    ]
+    organizations = [
+        Organization(
+            name=f'{NAME} {index}',
+            building=buildings[index % size],
+            phones=[
+                OrganizationPhone(phone_number=f'8-800-555-{index:04}'),
+                OrganizationPhone(phone_number='2-222-222'),
+            ],
+            activities=[child] if index % 2 else [root, child],
+        )
+        for index in range(size * size)
+    ]
+    session.add_all(organizations)
+    await session.flush()
+    return Seed(
+        root_id=root.id,
+        child_id=child.id,
+        building_ids=[building.id for building in buildings],
+        organization_ids=[organization.id for organization in organizations],
+    )
+
+
+@pytest.fixture
+async def connection():
+    """Connection in a transaction rolled back at the end; skips without a database."""
+    try:
+        connection = await async_engine.connect()
+    except (OSError, DBAPIError) as e:
+        await async_engine.dispose()
+        pytest.skip(f'Database is unavailable: {e}')
+
+    transaction = await connection.begin()
+    try:
+        yield connection
+    finally:
+        await transaction.rollback()
+        await connection.close()
+        await async_engine.dispose()
+
+
+@pytest.fixture(params=[2, 20], ids=['small', 'large'])
+async def seeded_client(
+    request,
+    connection,
+    monkeypatch,
+) -> AsyncIterator[tuple[Seed, httpx.AsyncClient]]:
+    """Client of the app whose sessions all see the uncommitted test data."""
+    # Сессии не фиксируют и не откатывают внешнюю транзакцию, и не добавляют
+    # SAVEPOINT, которые попали бы в счётчик запросов
+    factory = async_sessionmaker(
+        connection,
+        expire_on_commit=False,
+        join_transaction_mode='rollback_only',
+    )
+    async with factory() as session:
+        seed = await _seed(request.param, session)
+
+    async def read_session() -> AsyncIterator[AsyncSession]:
+        async with factory() as session:
+            yield session
+
+    async def open_read_session(read_primary) -> AsyncSession:
+        return factory()
+
+    monkeypatch.setitem(app.dependency_overrides, get_read_session, read_session)
+    monkeypatch.setattr(organizations_service, 'open_read_session', open_read_session)
+    # Кэш ответов пуст, а дерево видов деятельности загружено заранее, как после NOTIFY
+    monkeypatch.setattr(response_cache, 'backend', MemoryCacheBackend(max_entries=1024))
+    monkeypatch.setattr(activity_service, 'async_session_factory', factory)
+    monkeypatch.setattr(ActivityTreeCache, 'listening', property(lambda _: True))
+    monkeypatch.setattr(activity_tree_cache, '_tree', None)
+    monkeypatch.setattr(activity_tree_cache, '_min_version', 0)
+    async with factory() as session:
+        await activity_tree_cache.get(session)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+        yield seed, client
+
+
+def test_every_get_route_has_a_budget():
+    paths = app.openapi()['paths']
+    routes = {path for path, operations in paths.items() if 'get' in operations}
+
+    assert routes == set(ROUTE_BUDGETS)
+
+
+async def test_get_routes_stay_within_statement_budget(seeded_client):
+    seed, client = seeded_client
+    requests = _requests(seed)
+    assert {route for route, _ in requests} == set(ROUTE_BUDGETS)
+
+    over_budget = {}
+    for route, url in requests:
+        before = _statements(route) or 0
+        response = await client.get(url)
+        assert response.status_code == 200, (url, response.text)
+        # Метка маршрута должна совпасть, иначе бюджет проверялся бы по нулю
+        after = _statements(route)
+        assert after is not None, route
+        statements = after - before
+        if statements > ROUTE_BUDGETS[route]:
+            over_budget[url] = statements
+
+    assert over_budget == {}
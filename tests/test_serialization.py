@@ -0,0 +1,136 @@
+from typing import Any
+
+import pytest
+from models import Activity, Building, Organization, OrganizationPhone
+from pydantic import TypeAdapter
+from schemas import (
+    ActivityOut,
+    ActivityOutNested,
+    BuildingListOut,
+    BuildingOutNested,
+    OrganizationBatchOut,
+    OrganizationMatchOut,
+    OrganizationNearbyOut,
+    OrganizationOut,
+    OrganizationOutNested,
+    Page,
+)
+from serialization import (
+    activity_nested_item,
+    building_nested_item,
+    dump_json,
+    organization_item,
+    organization_nested_item,
+)
+from services.activity_service import ActivityTree, build_activity_nodes
+from services.buildings_service import _building_item
+
+
+def _validated_json(response_type: Any, data: Any, *, from_attributes: bool = False) -> bytes:
+    adapter = TypeAdapter(response_type)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=from_attributes))
+
+
+def _building() -> Building:
+    building = Building(id=7, address='ул. Ленина, 1 "А"\\2')
+    building.longitude = 37.617589876543214
+    building.latitude = 55.75581412345679
+    return building
+
+
+def _organization(organization_id: int, building: Building) -> Organization:
+    organization = Organization(id=organization_id, name=f'ООО "Рога и копыта" {organization_id}')
+    organization.building = building
+    organization.phones = [
+        OrganizationPhone(id=1, phone_number='8-800-555-35-35'),
+        OrganizationPhone(id=2, phone_number='2-222-222'),
+    ]
+    organization.activities = [Activity(id=1, name='Еда'), Activity(id=3, name='Мясо')]
+    return organization
+
+
+@pytest.fixture
+def building() -> Building:
+    building = _building()
+    building.organizations = [_organization(1, building), _organization(2, building)]
+    return building
+
+
+@pytest.mark.parametrize(
+    ('response_type', 'builder'),
+    [
+        (BuildingOutNested, building_nested_item),
+        (OrganizationOut, organization_item),
+    ],
+)
+def test_building_builders_match_validated_output(building, response_type, builder):
+    source = building if response_type is BuildingOutNested else building.organizations[0]
+    data = builder(source)
+
+    assert dump_json(data) == _validated_json(response_type, data)
+    assert dump_json(data) == _validated_json(response_type, source, from_attributes=True)
+
+
+@pytest.mark.parametrize(
+    ('response_type', 'builder'),
+    [
+        (ActivityOutNested, activity_nested_item),
+        (OrganizationOutNested, organization_nested_item),
+    ],
+)
+def test_nested_builders_match_validated_output(building, response_type, builder):
+    organization = building.organizations[0]
+    source = organization.activities[0] if response_type is ActivityOutNested else organization
+    data = builder(source)
+
+    assert dump_json(data) == _validated_json(response_type, data)
+    assert dump_json(data) == _validated_json(response_type, source, from_attributes=True)
+
+
+@pytest.mark.parametrize(
+    ('embed', 'distance'),
+    [(False, None), (True, None), (True, 12.5), (False, 0.0)],
+)
+def test_building_item_matches_validated_output(building, embed, distance):
+    data = _building_item(building, 2, embed, distance)
+
+    assert dump_json(data) == _validated_json(BuildingListOut, data)
+
+
+def test_activity_nodes_match_validated_output():
+    tree = ActivityTree.build(
+        1,
+        [(1, None, 'Еда'), (2, 1, 'Мясо'), (3, 2, 'Фарш'), (4, None, 'Авто')],
+    )
+
+    with_counts = build_activity_nodes(tree, tree.roots, {1: 3, 2: 1})
+    without_counts = build_activity_nodes(tree, tree.roots, None)
+
+    assert dump_json(with_counts) == _validated_json(list[ActivityOut], with_counts)
+    assert dump_json(without_counts) == _validated_json(list[ActivityOut], without_counts)
+
+
+def test_pages_match_validated_output(building):
+    organizations = [organization_item(organization) for organization in building.organizations]
+    pages = [
+        (Page[OrganizationOut], {'items': organizations, 'next_cursor': 'eyJpZCI6Mn0'}),
+        (
+            Page[OrganizationMatchOut],
+            {
+                'items': [{'organization': item, 'score': 0.5} for item in organizations],
+                'next_cursor': None,
+            },
+        ),
+        (
+            Page[OrganizationNearbyOut],
+            {
+                'items': [{'organization': item, 'distance': 15.25} for item in organizations],
+                'next_cursor': None,
+            },
+        ),
+        (OrganizationBatchOut, {'items': organizations, 'missing': [5]}),
+        (Page[OrganizationOut], {'items': [], 'next_cursor': None}),
+    ]
+
+    for response_type, data in pages:
+        assert dump_json(data) == _validated_json(response_type, data)